@@ -5,68 +5,115 @@ Main FastAPI application
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, ConfigDict, StringConstraints
 from pathlib import Path
+from urllib.parse import quote
 from contextlib import asynccontextmanager
+from anyio import to_thread
 import config
-from pipeline import VideoGeneratorPipeline
-import uuid
-from typing import Optional
+import logging
+from logging_config import setup_logging
+from database import VideoDatabase
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional
+from typing_extensions import Annotated
 from job_queue import JobQueue, JobStatus
+import orjson
+import hashlib
 import threading
 import time
-import traceback
-from datetime import datetime
+from collections import OrderedDict
 
-# Background worker state
-worker_running = False
-worker_thread = None
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Option lists rendered into the templates
+VIDEO_FORMAT_NAMES = tuple(config.VIDEO_FORMATS.keys())
+VOICE_NAMES = config.VOICE_NAMES
+
+# Configuration endpoints serve static data, so their JSON bodies and ETags
+# are computed once at import instead of on every request
+CONFIG_CACHE_CONTROL = 'public, max-age=3600'
+
+
+def _static_json(content) -> tuple:
+    """Serialize a static response body and derive its ETag"""
+    body = orjson.dumps(content)
+    return body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+_CONFIG_JSON = _static_json({
+    'video_formats': VIDEO_FORMAT_NAMES,
+    'video_styles': config.VIDEO_STYLES,
+    'voice_types': VOICE_NAMES,
+    'max_script_length': config.MAX_SCRIPT_LENGTH,
+    'image_count': config.IMAGE_COUNT
+})
+_STYLES_JSON = _static_json({
+    'styles': config.VIDEO_STYLES,
+    'count': len(config.VIDEO_STYLES)
+})
+_VOICES_JSON = _static_json({
+    'voices': VOICE_NAMES,
+    'voice_details': dict(config.VOICE_TYPES),
+    'count': len(config.VOICE_TYPES)
+})
+_FORMATS_JSON = _static_json({
+    'formats': {k: {'width': v[0], 'height': v[1]} for k, v in config.VIDEO_FORMATS.items()},
+    'count': len(config.VIDEO_FORMATS)
+})
+
+
+def _static_json_response(request: Request, static_json: tuple) -> Response:
+    """Return a pre-serialized body, or 304 if the client already has it"""
+    body, etag = static_json
+    headers = {'ETag': etag, 'Cache-Control': CONFIG_CACHE_CONTROL}
+    
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or
+                          etag in (tag.strip() for tag in if_none_match.split(','))):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers reuse assets without revalidating"""
+    
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers['Cache-Control'] = CONFIG_CACHE_CONTROL
+        return response
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
-    global worker_thread, worker_running
-    
-    # Startup: Start background worker
-    worker_thread = threading.Thread(target=background_worker, daemon=True)
-    worker_thread.start()
-    print("✓ Background worker thread started")
+    # Size the threadpool that runs the sync (def) handlers
+    to_thread.current_default_thread_limiter().total_tokens = config.API_THREADPOOL_SIZE
     
     yield  # Application is running
-    
-    # Shutdown: Stop background worker
-    worker_running = False
-    print("✓ Background worker stopping...")
 
 
 app = FastAPI(
     title="ClipForge",
     description="AI Video Generation System",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
 # Configure CORS for frontend integration
+# Local dev servers match the origin regex; other origins come from CORS_ORIGINS.
+# Credentials can't be combined with a wildcard origin, so they're off for "*".
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:*",
-        "http://127.0.0.1:*",
-        "http://0.0.0.0:*",
-        "http://localhost:3000",
-        "http://localhost:3001",
-        "http://localhost:5173",
-        "http://localhost:8080",
-        "http://127.0.0.1:3000",
-        "http://127.0.0.1:5173",
-        "http://127.0.0.1:8080",
-        "*"  # Allow all for development
-    ],
-    allow_credentials=True,
+    allow_origins=config.CORS_ORIGINS,
+    allow_origin_regex=config.CORS_ORIGIN_REGEX or None,
+    allow_credentials='*' not in config.CORS_ORIGINS,
     allow_methods=["*"],  # Allow all HTTP methods
     allow_headers=["*"],  # Allow all headers
 )
@@ -75,14 +122,14 @@ app.add_middleware(
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     errors = exc.errors()
-    print(f"Validation error: {errors}")
+    logger.warning("Validation error: %s", errors)
     error_messages = []
     for error in errors:
         field = ' -> '.join(str(x) for x in error['loc'])
         message = error['msg']
         error_messages.append(f"{field}: {message}")
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=400,
         content={
             "error": "Validation failed",
@@ -92,127 +139,110 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Templates
 templates = Jinja2Templates(directory="templates")
 
-# Initialize pipeline
-pipeline = VideoGeneratorPipeline()
+# The API only reads and writes records; videos are generated by the worker,
+# so the server never builds a VideoGeneratorPipeline. Both stores are opened
+# on first use rather than at import.
+@lru_cache(maxsize=None)
+def get_db() -> VideoDatabase:
+    """Get the shared video database"""
+    return VideoDatabase()
 
-# Initialize job queue
-job_queue = JobQueue()
 
+@lru_cache(maxsize=None)
+def get_job_queue() -> JobQueue:
+    """Get the shared job queue"""
+    return JobQueue()
 
-def background_worker(check_interval: int = 2):
-    """
-    Background worker that processes video generation jobs from the queue
-    Runs in a separate thread within the same process
-    """
-    global worker_running
-    worker_running = True
+# Video records don't change once written, so lookups by ID are cached.
+# Library listings are cached briefly so bursts of page loads share one query.
+VIDEO_CACHE_SIZE = 1024
+ALL_VIDEOS_TTL = 2.0
+
+_video_cache = OrderedDict()
+_all_videos_cache = {'expires': 0.0, 'videos': None}
+_video_cache_lock = threading.Lock()
+
+
+def get_video_cached(video_id: int) -> Optional[Dict]:
+    """Get a video by ID through the LRU cache"""
+    with _video_cache_lock:
+        video = _video_cache.get(video_id)
+        if video is not None:
+            _video_cache.move_to_end(video_id)
+            return video
     
-    print(f"\n{'='*60}")
-    print("Background Worker Started")
-    print(f"Checking queue every {check_interval} seconds")
-    print(f"{'='*60}\n")
+    video = get_db().get_video(video_id)
     
-    while worker_running:
-        try:
-            # Get next job from queue
-            job = job_queue.get_next_job()
-            
-            if job:
-                job_id = job['id']
-                
-                try:
-                    print(f"\n{'='*60}")
-                    print(f"Processing Job: {job_id}")
-                    print(f"Title: {job['video_data'].get('title', 'Untitled')}")
-                    print(f"{'='*60}\n")
-                    
-                    # Mark as processing
-                    job_queue.update_job(job_id, {
-                        'status': JobStatus.PROCESSING,
-                        'progress': 5,
-                        'message': 'Starting video generation...',
-                        'started_at': datetime.now().isoformat()
-                    })
-                    
-                    # Update progress - narration
-                    job_queue.update_job(job_id, {
-                        'progress': 15,
-                        'message': 'Generating narration...'
-                    })
-                    
-                    # Generate video using pipeline
-                    result = pipeline.generate_video(job['video_data'])
-                    
-                    # Mark as completed
-                    job_queue.update_job(job_id, {
-                        'status': JobStatus.COMPLETED,
-                        'progress': 100,
-                        'message': 'Video generation complete!',
-                        'completed_at': datetime.now().isoformat(),
-                        'result': result
-                    })
-                    
-                    print(f"\n✓ Job {job_id} completed successfully!\n")
-                    
-                except Exception as e:
-                    error_message = str(e)
-                    error_trace = traceback.format_exc()
-                    
-                    print(f"\n✗ Job {job_id} failed!")
-                    print(f"Error: {error_message}")
-                    print(f"Trace:\n{error_trace}\n")
-                    
-                    # Mark as failed
-                    job_queue.update_job(job_id, {
-                        'status': JobStatus.FAILED,
-                        'message': f'Error: {error_message}',
-                        'completed_at': datetime.now().isoformat(),
-                        'error': error_trace
-                    })
-            else:
-                # No jobs available, wait
-                time.sleep(check_interval)
-                
-        except Exception as e:
-            print(f"Worker error: {e}")
-            print(traceback.format_exc())
-            time.sleep(check_interval)
-    
-    print("\nBackground Worker Stopped\n")
+    # Misses aren't cached: the worker may add the video at any time
+    if video is not None:
+        with _video_cache_lock:
+            _video_cache[video_id] = video
+            if len(_video_cache) > VIDEO_CACHE_SIZE:
+                _video_cache.popitem(last=False)
+    return video
+
+
+def get_all_videos_cached() -> List[Dict]:
+    """Get all videos, reusing the last result for ALL_VIDEOS_TTL seconds"""
+    with _video_cache_lock:
+        if _all_videos_cache['videos'] is not None and time.monotonic() < _all_videos_cache['expires']:
+            return _all_videos_cache['videos']
+    
+    videos = get_db().get_all_videos()
+    
+    with _video_cache_lock:
+        _all_videos_cache['videos'] = videos
+        _all_videos_cache['expires'] = time.monotonic() + ALL_VIDEOS_TTL
+    return videos
+
+
+def invalidate_video_cache(video_id: int):
+    """Drop a video from the caches after it is changed or deleted"""
+    with _video_cache_lock:
+        _video_cache.pop(video_id, None)
+        _all_videos_cache['videos'] = None
 
 
 # Pydantic models
 class VideoRequest(BaseModel):
+    # Length limits are enforced by pydantic-core during validation
+    model_config = ConfigDict(extra='forbid', frozen=True)
+
     title: str
     category: str
     format: str
     style: str
-    voice: str
-    script: str
+    voice: Literal[VOICE_NAMES]  # Unknown voices fail validation (400)
+    script: Annotated[str, StringConstraints(max_length=config.MAX_SCRIPT_LENGTH)]
     keywords: Optional[str] = ''
     negative_keywords: Optional[str] = ''
 
 
+# Handlers that touch the database, the job queue or the filesystem are plain
+# `def` so FastAPI runs them in its threadpool instead of blocking the event
+# loop. Only handlers that never do blocking I/O may be declared `async def`.
+
+
 @app.get("/")
 async def index(request: Request):
     """Render main page"""
     return templates.TemplateResponse("index.html", {
         "request": request,
-        "video_formats": list(config.VIDEO_FORMATS.keys()),
+        "video_formats": VIDEO_FORMAT_NAMES,
         "video_styles": config.VIDEO_STYLES,
-        "voice_types": list(config.VOICE_TYPES.keys())
+        "voice_types": VOICE_NAMES
     })
 
 
 @app.get("/videos")
-async def videos_page(request: Request):
+def videos_page(request: Request):
     """Render all videos page"""
-    videos = pipeline.get_all_videos()
+    videos = get_all_videos_cached()
     return templates.TemplateResponse("videos.html", {
         "request": request,
         "videos": videos,
@@ -220,37 +250,28 @@ async def videos_page(request: Request):
     })
 
 
-@app.post("/api/create-video")
-async def create_video(video_data: VideoRequest):
+@app.post("/api/create-video", status_code=202)
+def create_video(video_data: VideoRequest):
     """Create a new video from request data - adds to queue"""
     try:
-        # Log incoming request
-        print(f"Received video request: {video_data.dict()}")
-        print(f"Script length: {len(video_data.script)}, Max allowed: {config.MAX_SCRIPT_LENGTH}")
+        request_data = video_data.model_dump()
         
-        # Validate script length
-        if len(video_data.script) > config.MAX_SCRIPT_LENGTH:
-            print(f"Script too long! {len(video_data.script)} > {config.MAX_SCRIPT_LENGTH}")
-            raise HTTPException(
-                status_code=400,
-                detail=f'Script too long. Maximum {config.MAX_SCRIPT_LENGTH} characters'
-            )
+        # Log incoming request
+        logger.info("Received video request: %s", request_data)
         
         # Add job to queue
-        job_id = job_queue.add_job(video_data.dict())
+        job_queue = get_job_queue()
+        job_id = job_queue.add_job(request_data)
         
         # Get queue position
         position = job_queue.get_queue_position(job_id)
         
-        return JSONResponse(
-            content={
-                'job_id': job_id,
-                'message': 'Video generation job added to queue',
-                'queue_position': position,
-                'status': 'queued'
-            },
-            status_code=202
-        )
+        return {
+            'job_id': job_id,
+            'message': 'Video generation job added to queue',
+            'queue_position': position,
+            'status': 'queued'
+        }
         
     except HTTPException:
         raise
@@ -259,8 +280,9 @@ async def create_video(video_data: VideoRequest):
 
 
 @app.get('/api/job-status/{job_id}')
-async def job_status(job_id: str):
+def job_status(job_id: str):
     """Check status of a video generation job"""
+    job_queue = get_job_queue()
     job = job_queue.get_job(job_id)
     
     if not job:
@@ -271,45 +293,46 @@ async def job_status(job_id: str):
         position = job_queue.get_queue_position(job_id)
         job['queue_position'] = position
     
-    return JSONResponse(content=job)
+    return job
 
 
 @app.get('/api/queue')
-async def get_queue():
+def get_queue():
     """Get all jobs in queue"""
+    job_queue = get_job_queue()
     queued = job_queue.get_queued_jobs()
     processing = job_queue.get_processing_jobs()
     
-    return JSONResponse(content={
+    return {
         'queued': queued,
         'processing': processing,
         'total_queued': len(queued),
         'total_processing': len(processing)
-    })
+    }
 
 
 @app.get('/api/all-videos')
-async def all_videos():
+def all_videos():
     """Get all generated videos"""
-    videos = pipeline.get_all_videos()
-    return JSONResponse(content=videos)
+    videos = get_all_videos_cached()
+    return videos
 
 
 @app.get('/api/video/{video_id}')
-async def get_video(video_id: int):
+def get_video(video_id: int):
     """Get specific video by ID"""
-    video = pipeline.db.get_video(video_id)
+    video = get_video_cached(video_id)
     
     if not video:
         raise HTTPException(status_code=404, detail='Video not found')
     
-    return JSONResponse(content=video)
+    return video
 
 
 @app.delete('/api/video/{video_id}')
-async def delete_video(video_id: int):
+def delete_video(video_id: int):
     """Delete a video by ID"""
-    video = pipeline.db.get_video(video_id)
+    video = get_video_cached(video_id)
     
     if not video:
         raise HTTPException(status_code=404, detail='Video not found')
@@ -320,33 +343,45 @@ async def delete_video(video_id: int):
         video_path.unlink()
     
     # Delete from database
-    pipeline.db.delete_video(video_id)
+    get_db().delete_video(video_id)
+    invalidate_video_cache(video_id)
     
-    return JSONResponse(content={'message': 'Video deleted successfully'})
+    return {'message': 'Video deleted successfully'}
 
 
 @app.get('/api/download/{video_id}')
-async def download_video(video_id: int):
+def download_video(video_id: int):
     """Download video file"""
-    videos = pipeline.get_all_videos()
-    video = next((v for v in videos if v['id'] == video_id), None)
+    video = get_video_cached(video_id)
     
     if not video:
         raise HTTPException(status_code=404, detail='Video not found')
     
+    # Stat once here and hand the result to FileResponse so it doesn't stat again
     video_path = Path(video['path'])
-    if not video_path.exists():
+    try:
+        stat_result = video_path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail='Video file not found')
     
+    # Behind nginx, let it send the file with sendfile(2) and handle ranges
+    if config.DOWNLOAD_ACCEL_PREFIX:
+        return Response(headers={
+            'X-Accel-Redirect': config.DOWNLOAD_ACCEL_PREFIX + quote(video_path.name),
+            'Content-Type': 'video/mp4',
+            'Content-Disposition': f"attachment; filename*=utf-8''{quote(video_path.name)}"
+        })
+    
     return FileResponse(
         path=video_path,
         media_type='video/mp4',
-        filename=video_path.name
+        filename=video_path.name,
+        stat_result=stat_result
     )
 
 
 @app.get('/api/config')
-async def get_config():
+async def get_config(request: Request):
     """
     Get Application Configuration
     
@@ -356,13 +391,7 @@ async def get_config():
     - Voice types (available AI voices)
     - Configuration limits
     """
-    return JSONResponse(content={
-        'video_formats': list(config.VIDEO_FORMATS.keys()),
-        'video_styles': config.VIDEO_STYLES,
-        'voice_types': list(config.VOICE_TYPES.keys()),
-        'max_script_length': config.MAX_SCRIPT_LENGTH,
-        'image_count': config.IMAGE_COUNT
-    })
+    return _static_json_response(request, _CONFIG_JSON)
 
 
 @app.get('/api/styles', 
@@ -371,7 +400,7 @@ async def get_config():
     response_description="List of style names",
     tags=["Configuration"]
 )
-async def get_styles():
+async def get_styles(request: Request):
     """
     Get Available Video Styles
     
@@ -381,10 +410,7 @@ async def get_styles():
     **Returns:**
     - List of style names (e.g., "Realistic Action Art", "Modern Abstract", etc.)
     """
-    return JSONResponse(content={
-        'styles': config.VIDEO_STYLES,
-        'count': len(config.VIDEO_STYLES)
-    })
+    return _static_json_response(request, _STYLES_JSON)
 
 
 @app.get('/api/voices',
@@ -393,7 +419,7 @@ async def get_styles():
     response_description="Dictionary of voice names and their IDs",
     tags=["Configuration"]
 )
-async def get_voices():
+async def get_voices(request: Request):
     """
     Get Available AI Voices
     
@@ -409,11 +435,7 @@ async def get_voices():
     - Dictionary with voice names as keys and ElevenLabs voice IDs as values
     - Total count of available voices
     """
-    return JSONResponse(content={
-        'voices': list(config.VOICE_TYPES.keys()),
-        'voice_details': config.VOICE_TYPES,
-        'count': len(config.VOICE_TYPES)
-    })
+    return _static_json_response(request, _VOICES_JSON)
 
 
 @app.get('/api/formats',
@@ -422,7 +444,7 @@ async def get_voices():
     response_description="Dictionary of format names and dimensions",
     tags=["Configuration"]
 )
-async def get_formats():
+async def get_formats(request: Request):
     """
     Get Available Video Formats
     
@@ -436,10 +458,7 @@ async def get_formats():
     **Returns:**
     - Dictionary with format names as keys and (width, height) tuples as values
     """
-    return JSONResponse(content={
-        'formats': {k: {'width': v[0], 'height': v[1]} for k, v in config.VIDEO_FORMATS.items()},
-        'count': len(config.VIDEO_FORMATS)
-    })
+    return _static_json_response(request, _FORMATS_JSON)
 
 
 if __name__ == '__main__':
@@ -453,7 +472,7 @@ if __name__ == '__main__':
     print(f"Server starting on http://{config.HOST}:{config.PORT}")
     print(f"API docs available at http://{config.HOST}:{config.PORT}/docs")
     print(f"")
-    print(f"✓ Background worker will start automatically")
+    print(f"ℹ Jobs are processed by the worker - run `python worker.py`")
     print(f"✓ Queue processing enabled - submit multiple jobs!")
     print(f"{'='*60}\n")
     
@@ -473,10 +492,31 @@ if __name__ == '__main__':
     else:
         use_reload = config.DEBUG
     
+    # Prefer the C implementations of the event loop and HTTP parser
+    # (both ship with uvicorn[standard]; uvloop is not available on Windows)
+    loop = 'auto'
+    if sys.platform != 'win32':
+        try:
+            import uvloop  # noqa: F401
+            loop = 'uvloop'
+        except ImportError:
+            loop = 'asyncio'
+    
+    try:
+        import httptools  # noqa: F401
+        http = 'httptools'
+    except ImportError:
+        http = 'h11'
+    
+    print(f"ℹ Event loop: {loop}, HTTP parser: {http}")
+    
     uvicorn.run(
         "app:app",
         host=config.HOST,
         port=config.PORT,
         reload=use_reload,
-        log_level="info"
+        loop=loop,
+        http=http,
+        log_level=config.LOG_LEVEL.lower(),
+        log_config=None  # Uvicorn's loggers propagate to our queued root handler
     )
@@ -0,0 +1,124 @@
+"""
+Asset Cache
+Content-addressed store for generated images, narration and image prompts,
+so a repeated prompt or script reuses the earlier result instead of calling
+the API again
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(*parts) -> str:
+    """
+    Hash the inputs that fully determine an asset
+
+    Args:
+        parts: Values such as provider, model, voice and prompt text
+
+    Returns:
+        Hex digest used as the cached file name
+    """
+    data = '\x1f'.join(str(part) for part in parts).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _place(src: Path, dest: Path):
+    """
+    Atomically copy src to dest
+
+    Copies rather than hard-links: generators overwrite their output paths in
+    place, which would also rewrite a linked cache entry.
+    """
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def fetch(key: str, suffix: str, dest: Path) -> bool:
+    """
+    Put a cached asset at dest
+
+    Args:
+        key: Cache key from cache_key()
+        suffix: File extension, e.g. '.png'
+        dest: Path the caller expects the asset at
+
+    Returns:
+        True on a cache hit, False if the asset has to be generated
+    """
+    if not config.ASSET_CACHE:
+        return False
+    try:
+        _place(config.CACHE_DIR / f"{key}{suffix}", dest)
+        return True
+    except OSError:
+        return False
+
+
+def store(key: str, suffix: str, src: Path):
+    """
+    Add a fully written asset to the cache
+
+    Args:
+        key: Cache key from cache_key()
+        suffix: File extension, e.g. '.png'
+        src: Generated file to cache
+    """
+    if not config.ASSET_CACHE:
+        return
+    try:
+        _place(src, config.CACHE_DIR / f"{key}{suffix}")
+    except OSError as e:
+        logger.warning("Could not cache %s: %s", src.name, e)
+
+
+def load_json(key: str):
+    """
+    Load a cached JSON value
+
+    Args:
+        key: Cache key from cache_key()
+
+    Returns:
+        The cached value, or None on a miss
+    """
+    if not config.ASSET_CACHE:
+        return None
+    try:
+        with open(config.CACHE_DIR / f"{key}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def store_json(key: str, value):
+    """
+    Cache a JSON-serializable value
+
+    Args:
+        key: Cache key from cache_key()
+        value: Value to cache
+    """
+    if not config.ASSET_CACHE:
+        return
+    dest = config.CACHE_DIR / f"{key}.json"
+    tmp = dest.with_name(f"{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, dest)
+    except OSError as e:
+        tmp.unlink(missing_ok=True)
+        logger.warning("Could not cache %s: %s", dest.name, e)
@@ -4,6 +4,7 @@ Main configuration file
 """
 import os
 from pathlib import Path
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -21,8 +22,13 @@ GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', '')
 # Flask Configuration
 SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key-change-in-production')
 DEBUG = os.getenv('DEBUG', 'True') == 'True'
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
 HOST = os.getenv('HOST', '0.0.0.0')
 PORT = int(os.getenv('PORT', 5000))
+API_THREADPOOL_SIZE = int(os.getenv('API_THREADPOOL_SIZE', min(32, (os.cpu_count() or 1) + 4)))  # Threads for sync API handlers
+CORS_ORIGINS = [o.strip() for o in os.getenv('CORS_ORIGINS', '').split(',') if o.strip()]  # Extra allowed origins, or *
+CORS_ORIGIN_REGEX = os.getenv('CORS_ORIGIN_REGEX', r'https?://(localhost|127\.0\.0\.1|0\.0\.0\.0)(:\d+)?')  # Local dev servers on any port
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '')  # e.g. /protected/videos/ - let nginx send downloads via X-Accel-Redirect
 
 # Directory Configuration
 OUTPUT_DIR = BASE_DIR / os.getenv('OUTPUT_DIR', 'outputs')
@@ -30,12 +36,23 @@ TEMP_DIR = BASE_DIR / os.getenv('TEMP_DIR', 'temp')
 VIDEOS_DIR = BASE_DIR / os.getenv('VIDEOS_DIR', 'outputs/videos')
 IMAGES_DIR = BASE_DIR / os.getenv('IMAGES_DIR', 'outputs/images')
 AUDIO_DIR = BASE_DIR / os.getenv('AUDIO_DIR', 'outputs/audio')
+CACHE_DIR = BASE_DIR / os.getenv('CACHE_DIR', 'outputs/cache')
 
 # Video Generation Settings
 DEFAULT_FPS = int(os.getenv('DEFAULT_FPS', 30))
 DEFAULT_DURATION_PER_IMAGE = int(os.getenv('DEFAULT_DURATION_PER_IMAGE', 5))
 IMAGE_COUNT = int(os.getenv('IMAGE_COUNT', 7))
 MAX_SCRIPT_LENGTH = int(os.getenv('MAX_SCRIPT_LENGTH', 1500))
+PIPELINE_POOL_SIZE = int(os.getenv('PIPELINE_POOL_SIZE', max(1, (os.cpu_count() or 2) // 2)))  # Videos generated in parallel by the worker
+QUEUE_POLL_INTERVAL = float(os.getenv('QUEUE_POLL_INTERVAL', 0.2))  # Seconds between checks for newly queued jobs
+IMAGE_CONCURRENCY = max(1, int(os.getenv('IMAGE_CONCURRENCY', 5)))  # Image API requests in flight per worker process
+ASSET_CACHE = os.getenv('ASSET_CACHE', 'True') == 'True'  # Reuse images/narration generated earlier for identical inputs
+VIDEO_CODEC = os.getenv('VIDEO_CODEC', 'auto')  # auto (hardware H.264 encoder if available), libx264, h264_nvenc, h264_qsv or h264_videotoolbox
+RENDER_BACKEND = os.getenv('RENDER_BACKEND', 'moviepy').lower()  # moviepy, or ffmpeg to render effects and subtitles in one ffmpeg filter graph
+EFFECT_INTERPOLATION = os.getenv('EFFECT_INTERPOLATION', 'linear').lower()  # Zoom effect resampling: nearest, linear, area, cubic or lanczos
+
+# Prompt Generation Settings
+PROMPT_MODEL = os.getenv('PROMPT_MODEL', 'gpt-4o-mini')  # AI model for image prompt generation
 
 # Subtitle Settings
 ENABLE_SUBTITLES = os.getenv('ENABLE_SUBTITLES', 'True') == 'True'
@@ -68,23 +85,19 @@ VIDEO_STYLES = [
     'Caricature'
 ]
 
-# Voice Types (ElevenLabs voices - from API)
-VOICE_TYPES = {
+# Voice IDs (ElevenLabs voices - from API), one entry per distinct voice
+VOICE_IDS = MappingProxyType({
     'Roger': 'CwhRBWXzGAHq8TQ4Fs17',      # Laid-Back, Casual, Resonant (Male)
     'Sarah': 'EXAVITQu4vr4xnSDxMaL',      # Mature, Reassuring, Confident (Female)
-    'Shelby': 'EXAVITQu4vr4xnSDxMaL',     # Alias for Sarah (Conversational)
     'Laura': 'FGY2WhTYpPnrIDTdsKH5',      # Enthusiast, Quirky Attitude (Female)
     'Charlie': 'IKne3meq5aSn9XLyUdCD',    # Deep, Confident, Energetic (Male)
     'George': 'JBFqnCBsd6RMkjVDRZzb',     # Warm, Captivating Storyteller (Male)
-    'James': 'JBFqnCBsd6RMkjVDRZzb',      # Alias for George (British Professional)
     'Callum': 'N2lVS1w4EtoT3dr4eOWO',     # Husky Trickster (Male)
-    'B.Giffen': 'N2lVS1w4EtoT3dr4eOWO',   # Alias for Callum (Audiobook Narrator)
     'River': 'SAz9YHcvj6GT2YYXdXww',      # Relaxed, Neutral, Informative (Neutral)
     'Liam': 'TX3LPaxmHKxFdv7VOQHJ',       # Energetic, Social Media Creator (Male)
     'Alice': 'Xb7hH8MSUJpSbSDYk0k2',      # Clear, Engaging Educator (Female)
     'Matilda': 'XrExE9yKIg1WjnnlVkGX',    # Knowledgable, Professional (Female)
     'Jessica': 'cgSgspJ2msm6clMCkdW9',    # Playful, Bright, Warm (Female)
-    'Lulu Lollipop': 'cgSgspJ2msm6clMCkdW9',  # Alias for Jessica (Sweet & Bubbly)
     'Eric': 'cjVigY5qzO86Huf0OWal',       # Smooth, Trustworthy (Male)
     'Chris': 'iP95p4xoKVk53GoZ742B',      # Charming, Down-to-Earth (Male)
     'Brian': 'nPczCjzI2devNBz1zQrb',      # Deep, Resonant and Comforting (Male)
@@ -92,8 +105,45 @@ VOICE_TYPES = {
     'Lily': 'pFZP5JQG7iQjIQuC4Bku',       # Velvety Actress (Female)
     'Adam': 'pNInz6obpgDQGcFmaJgB',       # Dominant, Firm (Male)
     'Bill': 'pqHfZKP75CvOlQylNhV4'        # Wise, Mature, Balanced (Male)
-}
+})
+
+# Alternative names offered in the UI -> the voice they stand for
+VOICE_ALIASES = MappingProxyType({
+    'Shelby': 'Sarah',                    # Conversational
+    'James': 'George',                    # British Professional
+    'B.Giffen': 'Callum',                 # Audiobook Narrator
+    'Lulu Lollipop': 'Jessica'            # Sweet & Bubbly
+})
+
+# Every selectable name -> voice ID, each alias listed after its voice
+_voice_types = {}
+for _name, _voice_id in VOICE_IDS.items():
+    _voice_types[_name] = _voice_id
+    for _alias, _canonical in VOICE_ALIASES.items():
+        if _canonical == _name:
+            _voice_types[_alias] = _voice_id
+VOICE_TYPES = MappingProxyType(_voice_types)
+VOICE_NAMES = tuple(VOICE_TYPES)
+
+# Voice ID -> canonical voice name
+VOICE_BY_ID = MappingProxyType({voice_id: name for name, voice_id in VOICE_IDS.items()})
+
+# Voice ID -> every name that maps to it, canonical name first
+VOICE_ID_TO_NAMES = MappingProxyType({
+    voice_id: tuple(n for n in VOICE_NAMES if VOICE_TYPES[n] == voice_id)
+    for voice_id in VOICE_BY_ID
+})
+del _voice_types, _name, _voice_id, _alias, _canonical
+
+_dirs_ready = False
+
 
-# Create directories
-for directory in [OUTPUT_DIR, TEMP_DIR, VIDEOS_DIR, IMAGES_DIR, AUDIO_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+def ensure_dirs():
+    """Create the output directories, once per process"""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    for directory in (OUTPUT_DIR, TEMP_DIR, VIDEOS_DIR, IMAGES_DIR, AUDIO_DIR, CACHE_DIR):
+        if not directory.is_dir():
+            directory.mkdir(parents=True, exist_ok=True)
+    _dirs_ready = True
@@ -2,12 +2,58 @@
 Database Module
 Handles SQLite database operations for video storage
 """
+import atexit
+import re
 import sqlite3
+import threading
 from pathlib import Path
+from collections.abc import Mapping
 from typing import List, Dict, Optional
 from datetime import datetime
 import config
 
+# Columns that update_video may change
+VIDEO_COLUMNS = frozenset({
+    'title', 'category', 'format', 'style', 'voice', 'script', 'keywords',
+    'negative_keywords', 'path', 'thumbnail_path', 'duration', 'created_at', 'status'
+})
+
+
+# Columns returned by queries, in SELECT order
+VIDEO_FIELDS = (
+    'id', 'title', 'category', 'format', 'style', 'voice', 'script', 'keywords',
+    'negative_keywords', 'path', 'thumbnail_path', 'duration', 'created_at', 'status'
+)
+VIDEO_SELECT = f"SELECT {', '.join(VIDEO_FIELDS)} FROM videos"
+VIDEO_SELECT_JOINED = f"SELECT {', '.join('v.' + f for f in VIDEO_FIELDS)} FROM videos v"
+_VIDEO_FIELD_INDEX = {name: i for i, name in enumerate(VIDEO_FIELDS)}
+
+
+class VideoRow(Mapping):
+    """
+    Read-only video record
+    
+    Wraps the row tuple and shares one column index across all rows, instead
+    of copying every row into its own dict. Behaves like a dict for lookups,
+    iteration, JSON encoding and templates.
+    """
+    __slots__ = ('_row',)
+    
+    def __init__(self, row: tuple):
+        self._row = row
+    
+    def __getitem__(self, key: str):
+        return self._row[_VIDEO_FIELD_INDEX[key]]
+    
+    def __iter__(self):
+        return iter(VIDEO_FIELDS)
+    
+    def __len__(self) -> int:
+        return len(VIDEO_FIELDS)
+    
+    def __repr__(self) -> str:
+        return f"VideoRow({dict(self)!r})"
+
 
 class VideoDatabase:
     """Manage video records in SQLite database"""
@@ -17,34 +63,113 @@ class VideoDatabase:
         if db_path is None:
             db_path = config.OUTPUT_DIR / 'videos.db'
         self.db_path = db_path
+        config.ensure_dirs()
+        
+        # One long-lived connection, serialized by a lock, instead of a
+        # connect/close per call
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=5,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA temp_store=MEMORY')
+        self._conn.execute('PRAGMA cache_size=-20000')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        atexit.register(self.close)
+        
+        self._update_sql_cache = {}  # Sorted column tuple -> UPDATE statement
+        
         self._create_tables()
     
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _query(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Run a SELECT returning plain tuples, for wrapping in VideoRow; caller holds the lock"""
+        cursor = self._conn.cursor()
+        cursor.row_factory = None
+        return cursor.execute(sql, params)
+    
     def _create_tables(self):
         """Create database tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS videos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                category TEXT,
-                format TEXT,
-                style TEXT,
-                voice TEXT,
-                script TEXT,
-                keywords TEXT,
-                negative_keywords TEXT,
-                path TEXT NOT NULL,
-                thumbnail_path TEXT,
-                duration REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'completed'
+        with self._lock:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS videos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    category TEXT,
+                    format TEXT,
+                    style TEXT,
+                    voice TEXT,
+                    script TEXT,
+                    keywords TEXT,
+                    negative_keywords TEXT,
+                    path TEXT NOT NULL,
+                    thumbnail_path TEXT,
+                    duration REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    status TEXT DEFAULT 'completed'
+                )
+            ''')
+            
+            # Newest-first listing reads the index instead of sorting the table
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_videos_created_at ON videos(created_at DESC)'
             )
-        ''')
+            
+            self.fts_enabled = self._create_search_index()
+    
+    def _create_search_index(self) -> bool:
+        """
+        Create the FTS5 index over title and category, kept in sync by triggers
+        
+        Returns:
+            True if full-text search is available, False if SQLite lacks FTS5
+        """
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'videos_fts'"
+        ).fetchone()
+        if exists:
+            return True
         
-        conn.commit()
-        conn.close()
+        try:
+            self._conn.executescript('''
+                BEGIN;
+                CREATE VIRTUAL TABLE videos_fts USING fts5(
+                    title, category, content='videos', content_rowid='id'
+                );
+                CREATE TRIGGER videos_fts_insert AFTER INSERT ON videos BEGIN
+                    INSERT INTO videos_fts(rowid, title, category)
+                    VALUES (new.id, new.title, new.category);
+                END;
+                CREATE TRIGGER videos_fts_delete AFTER DELETE ON videos BEGIN
+                    INSERT INTO videos_fts(videos_fts, rowid, title, category)
+                    VALUES ('delete', old.id, old.title, old.category);
+                END;
+                CREATE TRIGGER videos_fts_update AFTER UPDATE OF title, category ON videos BEGIN
+                    INSERT INTO videos_fts(videos_fts, rowid, title, category)
+                    VALUES ('delete', old.id, old.title, old.category);
+                    INSERT INTO videos_fts(rowid, title, category)
+                    VALUES (new.id, new.title, new.category);
+                END;
+                INSERT INTO videos_fts(videos_fts) VALUES ('rebuild');
+                COMMIT;
+            ''')
+        except sqlite3.OperationalError as e:
+            if self._conn.in_transaction:
+                self._conn.execute('ROLLBACK')
+            print(f"Full-text search unavailable, using LIKE search: {e}")
+            return False
+        return True
     
     def add_video(self, video_data: Dict) -> int:
         """
@@ -56,15 +181,23 @@ class VideoDatabase:
         Returns:
             ID of the newly created video record
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO videos (
-                title, category, format, style, voice, script,
-                keywords, negative_keywords, path, duration, created_at, status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        return self.add_videos([video_data])[0]
+    
+    def add_videos(self, videos: List[Dict]) -> List[int]:
+        """
+        Add several videos in a single transaction
+        
+        Args:
+            videos: List of video metadata dictionaries
+            
+        Returns:
+            IDs of the newly created video records, in input order
+        """
+        if not videos:
+            return []
+        
+        now = datetime.now().isoformat()
+        rows = [(
             video_data.get('title'),
             video_data.get('category'),
             video_data.get('format'),
@@ -75,31 +208,38 @@ class VideoDatabase:
             video_data.get('negative_keywords', ''),
             video_data.get('path'),
             video_data.get('duration', 0.0),
-            video_data.get('created_at', datetime.now().isoformat()),
+            video_data.get('created_at', now),
             video_data.get('status', 'completed')
-        ))
+        ) for video_data in videos]
         
-        video_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany('''
+                    INSERT INTO videos (
+                        title, category, format, style, voice, script,
+                        keywords, negative_keywords, path, duration, created_at, status
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                last_id = self._conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
         
-        return video_id
+        # The write lock is held for the whole batch, so its IDs are consecutive
+        return list(range(last_id - len(rows) + 1, last_id + 1))
     
-    def get_video(self, video_id: int) -> Optional[Dict]:
+    def get_video(self, video_id: int) -> Optional[VideoRow]:
         """Get a single video by ID"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM videos WHERE id = ?', (video_id,))
-        row = cursor.fetchone()
-        conn.close()
+        with self._lock:
+            row = self._query(f'{VIDEO_SELECT} WHERE id = ?', (video_id,)).fetchone()
         
         if row:
-            return dict(row)
+            return VideoRow(row)
         return None
     
-    def get_all_videos(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+    def get_all_videos(self, limit: int = 100, offset: int = 0) -> List[VideoRow]:
         """
         Get all videos from database
         
@@ -108,90 +248,100 @@ class VideoDatabase:
             offset: Number of videos to skip
             
         Returns:
-            List of video dictionaries
+            List of video records
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM videos 
-            ORDER BY created_at DESC 
-            LIMIT ? OFFSET ?
-        ''', (limit, offset))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with self._lock:
+            rows = self._query(f'''
+                {VIDEO_SELECT}
+                ORDER BY created_at DESC 
+                LIMIT ? OFFSET ?
+            ''', (limit, offset)).fetchall()
         
-        return [dict(row) for row in rows]
+        return [VideoRow(row) for row in rows]
     
     def update_video(self, video_id: int, updates: Dict) -> bool:
-        """Update video metadata"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Build dynamic UPDATE query
-        fields = []
-        values = []
-        for key, value in updates.items():
-            if key != 'id':  # Don't update ID
-                fields.append(f"{key} = ?")
-                values.append(value)
-        
-        if not fields:
-            conn.close()
+        """
+        Update video metadata
+        
+        Args:
+            video_id: Video identifier
+            updates: Columns to change; an 'id' key is ignored
+            
+        Returns:
+            True if the video was updated
+        """
+        columns = tuple(sorted(key for key in updates if key != 'id'))
+        if not columns:
             return False
         
+        unknown = set(columns) - VIDEO_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown video fields: {', '.join(sorted(unknown))}")
+        
+        # One canonical statement per column set, so sqlite3's statement
+        # cache reuses the prepared UPDATE instead of re-parsing it
+        query = self._update_sql_cache.get(columns)
+        if query is None:
+            query = f"UPDATE videos SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?"
+            self._update_sql_cache[columns] = query
+        
+        values = [updates[c] for c in columns]
         values.append(video_id)
-        query = f"UPDATE videos SET {', '.join(fields)} WHERE id = ?"
         
-        cursor.execute(query, values)
-        conn.commit()
-        affected = cursor.rowcount
-        conn.close()
+        with self._lock:
+            cursor = self._conn.execute(query, values)
         
-        return affected > 0
+        return cursor.rowcount > 0
     
     def delete_video(self, video_id: int) -> bool:
         """Delete a video from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM videos WHERE id = ?', (video_id,))
-        conn.commit()
-        affected = cursor.rowcount
-        conn.close()
+        with self._lock:
+            cursor = self._conn.execute('DELETE FROM videos WHERE id = ?', (video_id,))
         
-        return affected > 0
+        return cursor.rowcount > 0
     
-    def search_videos(self, query: str) -> List[Dict]:
-        """Search videos by title or category"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def search_videos(self, query: str) -> List[VideoRow]:
+        """
+        Search videos by title or category
         
-        search_pattern = f'%{query}%'
-        cursor.execute('''
-            SELECT * FROM videos 
-            WHERE title LIKE ? OR category LIKE ?
-            ORDER BY created_at DESC
-        ''', (search_pattern, search_pattern))
+        Uses the FTS5 index with prefix matching on each word of the query,
+        best matches first. Falls back to a substring LIKE scan when FTS5
+        isn't available.
         
-        rows = cursor.fetchall()
-        conn.close()
+        Args:
+            query: Search text
+            
+        Returns:
+            List of matching video records
+        """
+        words = re.findall(r'\w+', query)
+        
+        if self.fts_enabled and words:
+            # Quote each word so FTS5 operators in user input are taken literally
+            match = ' '.join(f'"{word}"*' for word in words)
+            with self._lock:
+                rows = self._query(f'''
+                    {VIDEO_SELECT_JOINED}
+                    JOIN videos_fts ON videos_fts.rowid = v.id
+                    WHERE videos_fts MATCH ?
+                    ORDER BY videos_fts.rank
+                ''', (match,)).fetchall()
+            return [VideoRow(row) for row in rows]
+        
+        search_pattern = f'%{query}%'
+        with self._lock:
+            rows = self._query(f'''
+                {VIDEO_SELECT}
+                WHERE title LIKE ? OR category LIKE ?
+                ORDER BY created_at DESC
+            ''', (search_pattern, search_pattern)).fetchall()
         
-        return [dict(row) for row in rows]
+        return [VideoRow(row) for row in rows]
     
     def get_video_count(self) -> int:
         """Get total number of videos"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM videos')
-        count = cursor.fetchone()[0]
-        conn.close()
-        
-        return count
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM videos').fetchone()[0]
 
 
 if __name__ == "__main__":
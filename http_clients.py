@@ -0,0 +1,64 @@
+"""
+Shared HTTP Clients
+One connection-pooled HTTP client per process, shared by the OpenAI,
+ElevenLabs and image download calls so they reuse TCP/TLS connections
+"""
+import threading
+from importlib.util import find_spec
+from typing import Optional
+import httpx
+import config
+
+# HTTP/2 needs the h2 package (httpx[http2]); without it the client stays on HTTP/1.1
+HTTP2_AVAILABLE = find_spec('h2') is not None
+
+_lock = threading.RLock()
+_http_client = None
+_openai_client = None
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the process-wide pooled HTTP client
+
+    Returns:
+        Shared httpx.Client with keep-alive and retries on connection errors,
+        multiplexing concurrent requests to one host over HTTP/2 when available
+    """
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    timeout=httpx.Timeout(60.0, connect=10.0),
+                    transport=httpx.HTTPTransport(
+                        retries=3,
+                        http2=HTTP2_AVAILABLE,
+                        limits=httpx.Limits(
+                            max_connections=100,
+                            max_keepalive_connections=20,
+                            keepalive_expiry=60.0
+                        )
+                    )
+                )
+    return _http_client
+
+
+def get_openai_client() -> Optional['OpenAI']:
+    """
+    Get the process-wide OpenAI client, built on the shared HTTP client
+
+    Returns:
+        OpenAI client, or None if no API key is configured
+    """
+    global _openai_client
+    if _openai_client is None and config.OPENAI_API_KEY:
+        with _lock:
+            if _openai_client is None:
+                # Imported on first use; the SDK is slow to import
+                from openai import OpenAI
+                _openai_client = OpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    http_client=get_http_client()
+                )
+    return _openai_client
@@ -2,87 +2,151 @@
 Image Generator Module
 Generates images using Google Gemini Nano Banana (primary) and OpenAI DALL-E (fallback)
 """
-from openai import OpenAI
-from google import genai
-import requests
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import threading
 import config
-import time
+import asset_cache
+from http_clients import get_http_client, get_openai_client
 import os
 
 
+# Caps image API requests in flight across every generate_images call in
+# this process, to stay under the provider's rate limit
+_image_slots = threading.BoundedSemaphore(config.IMAGE_CONCURRENCY)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# DALL-E 3 only supports 1024x1024, 1792x1024, 1024x1792
+DALLE_SIZES = {
+    '9:16': '1024x1792',  # Vertical
+    '16:9': '1792x1024',  # Horizontal
+    '1:1': '1024x1024'    # Square
+}
+
+# DALL-E size -> Gemini aspect ratio
+GEMINI_ASPECT_RATIOS = {size: video_format for video_format, size in DALLE_SIZES.items()}
+
+
+@lru_cache(maxsize=1)
+def _default_font():
+    """Load Pillow's default font once instead of once per placeholder"""
+    from PIL import ImageFont
+    return ImageFont.load_default()
+
+
 class ImageGenerator:
     """Generate images using Gemini Nano Banana (primary) and DALL-E (fallback)"""
     
     def __init__(self):
         """Initialize the image generator"""
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY) if config.OPENAI_API_KEY else None
+        self.client = get_openai_client()
         
         # Initialize Gemini with new API
         self.gemini_key = os.getenv('GOOGLE_API_KEY')
         if self.gemini_key:
+            # Imported only when Gemini is configured; google-genai is slow to import
+            from google import genai
             self.gemini_client = genai.Client(api_key=self.gemini_key)
     
-    def generate_images(self, prompts: List[Dict[str, str]], 
-                       video_format: str = '16:9') -> List[Path]:
+    def generate_images(self, prompts: Iterable[Dict[str, str]], 
+                       video_format: str = '16:9', run_id: str = '',
+                       force: bool = False) -> List[Path]:
         """
         Generate images from prompts
         
         Args:
-            prompts: List of prompt dictionaries
+            prompts: Prompt dictionaries; may be a generator such as
+                ImagePromptGenerator.stream_prompts, in which case each image
+                is started as soon as its prompt arrives
             video_format: Video aspect ratio (9:16, 16:9, 1:1)
+            run_id: Optional identifier added to file names so concurrent
+                runs don't overwrite each other's images
+            force: Generate new images even if identical prompts are cached
             
         Returns:
             List of paths to generated images
         """
-        image_paths = []
-        
         # Determine image size based on format
         size = self._get_image_size(video_format)
         
-        print(f"Generating {len(prompts)} images at {size} resolution...")
+        print(f"Generating images at {size} resolution...")
+        
+        # Each image is an independent API round-trip, so request them in
+        # parallel; results are collected in prompt order
+        with ThreadPoolExecutor(max_workers=config.IMAGE_CONCURRENCY) as executor:
+            futures = [
+                executor.submit(self._generate_one, i, prompt_dict, size, video_format, run_id, force)
+                for i, prompt_dict in enumerate(prompts, 1)
+            ]
+            return [future.result() for future in futures]
+    
+    def _generate_one(self, i: int, prompt_dict: Dict[str, str], size: str,
+                      video_format: str, run_id: str = '', force: bool = False) -> Path:
+        """
+        Generate a single image, falling back to a placeholder on failure
+        
+        Args:
+            i: 1-based image index, used in the file name
+            prompt_dict: Prompt dictionary
+            size: DALL-E image size
+            video_format: Video aspect ratio, used for placeholders
+            run_id: Optional identifier added to the file name
+            force: Skip the asset cache lookup
+            
+        Returns:
+            Path to the generated (or placeholder) image
+        """
+        cache_key = asset_cache.cache_key(
+            'image', size, prompt_dict['prompt'], prompt_dict.get('negative_prompt', '')
+        )
+        cached_path = config.IMAGES_DIR / f"image_{self._tag(run_id)}{i:03d}.png"
+        if not force and asset_cache.fetch(cache_key, '.png', cached_path):
+            print(f"Image {i} reused from cache")
+            return cached_path
+        
+        try:
+            with _image_slots:
+                image_path = self._generate_with_providers(i, prompt_dict, size, run_id)
+            
+            if image_path:
+                print(f"Image {i} saved to {image_path}")
+                asset_cache.store(cache_key, '.png', image_path)
+                return image_path
+            raise Exception("Both Gemini and DALL-E failed")
+            
+        except Exception as e:
+            print(f"Error generating image {i}: {e}")
+            # Create a placeholder image
+            return self._create_placeholder(i, video_format, run_id)
+    
+    def _generate_with_providers(self, i: int, prompt_dict: Dict[str, str], size: str,
+                                 run_id: str = '') -> Path:
+        """Try Gemini, then DALL-E; returns the image path or None"""
+        image_path = None
         
-        for i, prompt_dict in enumerate(prompts, 1):
+        # Try Gemini first
+        if self.gemini_key:
             try:
-                print(f"Generating image {i}/{len(prompts)}...")
-                image_path = None
-                
-                # Try Gemini first
-                if self.gemini_key:
-                    try:
-                        print(f"Attempting generation with Gemini...")
-                        image_path = self._generate_with_gemini(prompt_dict, i, size)
-                        if image_path:
-                            print(f"Image {i} generated with Gemini")
-                    except Exception as gemini_error:
-                        print(f"Gemini failed: {gemini_error}, falling back to DALL-E...")
-                
-                # Fallback to DALL-E if Gemini failed or not configured
-                if not image_path:
-                    print(f"Generating with OpenAI DALL-E...")
-                    image_path = self._generate_with_dalle(prompt_dict, i, size)
-                    if image_path:
-                        print(f"Image {i} generated with DALL-E")
-                
+                print(f"Generating image {i} with Gemini...")
+                image_path = self._generate_with_gemini(prompt_dict, i, size, run_id)
                 if image_path:
-                    image_paths.append(image_path)
-                    print(f"Image {i} saved to {image_path}")
-                else:
-                    raise Exception("Both Gemini and DALL-E failed")
-                
-                # Rate limiting
-                time.sleep(1)
-                
-            except Exception as e:
-                print(f"Error generating image {i}: {e}")
-                # Create a placeholder image
-                image_path = self._create_placeholder(i, video_format)
-                image_paths.append(image_path)
+                    print(f"Image {i} generated with Gemini")
+            except Exception as gemini_error:
+                print(f"Gemini failed: {gemini_error}, falling back to DALL-E...")
+        
+        # Fallback to DALL-E if Gemini failed or not configured
+        if not image_path:
+            print(f"Generating image {i} with OpenAI DALL-E...")
+            image_path = self._generate_with_dalle(prompt_dict, i, size, run_id)
+            if image_path:
+                print(f"Image {i} generated with DALL-E")
         
-        return image_paths
+        return image_path
     
-    def _generate_with_gemini(self, prompt_dict: Dict[str, str], index: int, size: str) -> Path:
+    def _generate_with_gemini(self, prompt_dict: Dict[str, str], index: int, size: str,
+                             run_id: str = '') -> Path:
         """Generate image using Google Gemini Nano Banana"""
         try:
             # Build full prompt with negative keywords incorporated
@@ -106,7 +170,7 @@ class ImageGenerator:
             for part in response.parts:
                 if part.inline_data:
                     # Save image
-                    image_path = config.IMAGES_DIR / f"image_{index:03d}.png"
+                    image_path = config.IMAGES_DIR / f"image_{self._tag(run_id)}{index:03d}.png"
                     
                     # Get image as PIL Image and save
                     image = part.as_image()
@@ -121,16 +185,16 @@ class ImageGenerator:
             print(f"Gemini Nano Banana generation error: {e}")
             return None
     
+    def _tag(self, run_id: str) -> str:
+        """File name prefix for a run"""
+        return f"{run_id}_" if run_id else ""
+    
     def _get_aspect_ratio(self, size: str) -> str:
         """Convert DALL-E size to Gemini aspect ratio"""
-        if size == "1024x1792":
-            return "9:16"  # Vertical
-        elif size == "1792x1024":
-            return "16:9"  # Horizontal
-        else:
-            return "1:1"   # Square
+        return GEMINI_ASPECT_RATIOS.get(size, '1:1')
     
-    def _generate_with_dalle(self, prompt_dict: Dict[str, str], index: int, size: str) -> Path:
+    def _generate_with_dalle(self, prompt_dict: Dict[str, str], index: int, size: str,
+                            run_id: str = '') -> Path:
         """Generate image using OpenAI DALL-E"""
         try:
             # Prepare prompt with explicit no-text instruction
@@ -154,13 +218,14 @@ class ImageGenerator:
             # Get image URL
             image_url = response.data[0].url
             
-            # Download image
-            image_data = requests.get(image_url).content
-            
-            # Save image
-            image_path = config.IMAGES_DIR / f"image_{index:03d}.png"
-            with open(image_path, 'wb') as f:
-                f.write(image_data)
+            # Stream the download straight to disk instead of holding the
+            # whole PNG in memory
+            image_path = config.IMAGES_DIR / f"image_{self._tag(run_id)}{index:03d}.png"
+            with get_http_client().stream('GET', image_url) as response:
+                response.raise_for_status()
+                with open(image_path, 'wb') as f:
+                    for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
             
             return image_path
             
@@ -170,17 +235,11 @@ class ImageGenerator:
     
     def _get_image_size(self, video_format: str) -> str:
         """Get DALL-E image size based on video format"""
-        # DALL-E 3 only supports 1024x1024, 1792x1024, 1024x1792
-        if video_format == '9:16':
-            return "1024x1792"  # Vertical
-        elif video_format == '16:9':
-            return "1792x1024"  # Horizontal
-        else:  # 1:1
-            return "1024x1024"  # Square
+        return DALLE_SIZES.get(video_format, '1024x1024')
     
-    def _create_placeholder(self, index: int, video_format: str) -> Path:
+    def _create_placeholder(self, index: int, video_format: str, run_id: str = '') -> Path:
         """Create a placeholder image when generation fails"""
-        from PIL import Image, ImageDraw, ImageFont
+        from PIL import Image, ImageDraw
         
         width, height = config.VIDEO_FORMATS[video_format]
         
@@ -189,16 +248,17 @@ class ImageGenerator:
         draw = ImageDraw.Draw(img)
         
         # Add text
+        font = _default_font()
         text = f"Image {index}"
-        bbox = draw.textbbox((0, 0), text)
+        bbox = draw.textbbox((0, 0), text, font=font)
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
         position = ((width - text_width) // 2, (height - text_height) // 2)
-        draw.text(position, text, fill=(255, 255, 255))
+        draw.text(position, text, fill=(255, 255, 255), font=font)
         
-        # Save
-        image_path = config.IMAGES_DIR / f"placeholder_{index:03d}.png"
-        img.save(image_path)
+        # Save with light compression; a flat placeholder doesn't benefit from more
+        image_path = config.IMAGES_DIR / f"placeholder_{self._tag(run_id)}{index:03d}.png"
+        img.save(image_path, optimize=False, compress_level=1)
         
         return image_path
 
@@ -2,12 +2,16 @@
 Job Queue Manager for Video Generation
 Handles queueing and tracking of video generation jobs
 """
-import json
-import uuid
-from datetime import datetime
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from pathlib import Path
 from enum import Enum
+from secrets import token_hex
+import orjson
+import config
 
 
 class JobStatus(str, Enum):
@@ -18,33 +22,138 @@ class JobStatus(str, Enum):
     FAILED = "failed"
 
 
+# Columns of the jobs table, and the ones holding JSON-encoded values
+JOB_COLUMNS = (
+    'id', 'status', 'progress', 'message', 'video_data', 'created_at',
+    'started_at', 'completed_at', 'result', 'error'
+)
+JSON_COLUMNS = frozenset({'video_data', 'result'})
+UPDATABLE_COLUMNS = frozenset(JOB_COLUMNS[1:])
+
+
 class JobQueue:
     """
-    Simple file-based job queue manager
-    Stores jobs in JSON file for persistence
+    SQLite-backed job queue manager
+    Jobs are stored in the video database so the API server and the worker
+    processes share one persistent queue with atomic updates
     """
     
-    def __init__(self, queue_file: str = "outputs/job_queue.json"):
-        """Initialize job queue"""
-        self.queue_file = Path(queue_file)
-        self.queue_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Initialize queue file if it doesn't exist
-        if not self.queue_file.exists():
-            self._save_queue({"jobs": {}, "queue": []})
-    
-    def _load_queue(self) -> Dict:
-        """Load queue from file"""
+    def __init__(self, db_path: Path = None, durable: bool = True):
+        """
+        Initialize job queue
+        
+        Args:
+            db_path: SQLite database file (defaults to the video database)
+            durable: Sync every commit to disk; pass False for bulk
+                maintenance where losing the last commits on power loss is fine
+        """
+        if db_path is None:
+            db_path = config.OUTPUT_DIR / 'videos.db'
+        self.db_path = db_path
+        config.ensure_dirs()
+        
+        # One connection per queue instance, shared by the API threadpool
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # In WAL mode NORMAL never corrupts the database, it only skips the
+        # fsync per commit
+        self._conn.execute(f"PRAGMA synchronous={'FULL' if durable else 'NORMAL'}")
+        
+        self._update_sql_cache = {}  # Sorted column tuple -> UPDATE statement
+        
+        self._create_tables()
+        self._import_legacy_queue(config.OUTPUT_DIR / 'job_queue.json')
+        
+    def _create_tables(self):
+        """Create the jobs table if it doesn't exist"""
+        with self._lock:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    progress INTEGER DEFAULT 0,
+                    message TEXT,
+                    video_data TEXT,
+                    created_at TEXT,
+                    started_at TEXT,
+                    completed_at TEXT,
+                    result TEXT,
+                    error TEXT
+                )
+            ''')
+            
+            # Every queue lookup filters on status and orders by created_at
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)'
+            )
+            # cleanup_old_jobs range-deletes finished jobs by completion time
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_jobs_status_completed ON jobs(status, completed_at)'
+            )
+            
+    def _import_legacy_queue(self, queue_file: Path):
+        """Import jobs from the old JSON queue file, once"""
+        if not queue_file.exists():
+            return
+            
         try:
-            with open(self.queue_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {"jobs": {}, "queue": []}
-    
-    def _save_queue(self, data: Dict):
-        """Save queue to file"""
-        with open(self.queue_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(queue_file, 'rb') as f:
+                jobs = orjson.loads(f.read()).get('jobs', {}).values()
+        except (orjson.JSONDecodeError, OSError):
+            return
+            
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                for job in jobs:
+                    values = [self._encode(column, job.get(column)) for column in JOB_COLUMNS]
+                    self._conn.execute(
+                        f"INSERT OR IGNORE INTO jobs ({', '.join(JOB_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(JOB_COLUMNS))})",
+                        values
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+                
+        try:
+            queue_file.rename(queue_file.with_suffix('.json.migrated'))
+        except FileNotFoundError:
+            # Another process (API server or worker) imported it at the same
+            # time; INSERT OR IGNORE made the second import a no-op
+            pass
+            
+    def _encode(self, column: str, value):
+        """Convert a job field to its database representation"""
+        if isinstance(value, Enum):
+            return value.value
+        if column in JSON_COLUMNS and value is not None:
+            return orjson.dumps(value).decode('utf-8')
+        return value
+        
+    def _row_to_job(self, row: sqlite3.Row) -> Dict:
+        """Convert a database row to a job dict"""
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = orjson.loads(job[column])
+        return job
+        
+    def _select(self, where: str = '', params: tuple = (), limit: int = -1) -> List[Dict]:
+        """Select jobs in queue order"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY created_at LIMIT ?", params + (limit,)
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
     
     def add_job(self, video_data: Dict) -> str:
         """
@@ -56,27 +165,20 @@ class JobQueue:
         Returns:
             Job ID
         """
-        job_id = str(uuid.uuid4())
-        
-        data = self._load_queue()
-        
-        job = {
-            'id': job_id,
-            'status': JobStatus.QUEUED,
-            'progress': 0,
-            'message': 'Job queued',
-            'video_data': video_data,
-            'created_at': datetime.now().isoformat(),
-            'started_at': None,
-            'completed_at': None,
-            'result': None,
-            'error': None
-        }
-        
-        data['jobs'][job_id] = job
-        data['queue'].append(job_id)
+        job_id = token_hex(16)
         
-        self._save_queue(data)
+        with self._lock:
+            self._conn.execute('''
+                INSERT INTO jobs (id, status, progress, message, video_data, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                job_id,
+                JobStatus.QUEUED.value,
+                0,
+                'Job queued',
+                self._encode('video_data', video_data),
+                datetime.now().isoformat()
+            ))
         
         return job_id
     
@@ -87,15 +189,113 @@ class JobQueue:
         Returns:
             Job dict or None if queue is empty
         """
-        data = self._load_queue()
+        jobs = self._select("WHERE status = ?", (JobStatus.QUEUED.value,), limit=1)
+        return jobs[0] if jobs else None
+        
+    def claim_next_job(self, updates: Dict = None) -> Optional[Dict]:
+        """
+        Atomically take the next queued job and mark it as processing
+        
+        Safe to call from several worker processes; each job is claimed once.
+        
+        Args:
+            updates: Extra fields to set on the claimed job
+            
+        Returns:
+            Claimed job dict or None if queue is empty
+        """
+        jobs = self.claim_next_jobs(1, updates)
+        return jobs[0] if jobs else None
+        
+    def claim_next_jobs(self, count: int, updates: Dict = None) -> List[Dict]:
+        """
+        Atomically take up to `count` queued jobs and mark them as processing
+        
+        All jobs are claimed in one transaction, so filling several free
+        worker slots costs a single round of locking and committing.
+        
+        Args:
+            count: Maximum number of jobs to claim
+            updates: Extra fields to set on the claimed jobs
+            
+        Returns:
+            Claimed job dicts in queue order (empty if queue is empty)
+        """
+        updates = dict(updates or {})
+        updates['status'] = JobStatus.PROCESSING
+        updates.setdefault('started_at', datetime.now().isoformat())
+        
+        with self._lock:
+            # Only take the write lock when there is something to claim
+            if count < 1 or not self._conn.execute(
+                "SELECT 1 FROM jobs WHERE status = ? LIMIT 1", (JobStatus.QUEUED.value,)
+            ).fetchone():
+                return []
+                
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                job_ids = tuple(row['id'] for row in self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT ?",
+                    (JobStatus.QUEUED.value, count)
+                ))
+                for job_id in job_ids:
+                    self._update(job_id, updates)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+                
+        if not job_ids:
+            return []
+        return self._select(f"WHERE id IN ({', '.join('?' * len(job_ids))})", job_ids)
+        
+    def wait_for_change(self, timeout: float, stop_event: threading.Event = None) -> bool:
+        """
+        Block until another connection commits to the database
+        
+        Polls PRAGMA data_version, which only reads the shared database
+        header, so a short poll interval is cheap and a newly queued job is
+        noticed almost immediately.
+        
+        Args:
+            timeout: Maximum seconds to wait
+            stop_event: Optional event that ends the wait early when set
+            
+        Returns:
+            True if the database changed, False on timeout or stop
+        """
+        stop_event = stop_event or threading.Event()
         
-        # Find first queued job
-        for job_id in data['queue']:
-            job = data['jobs'].get(job_id)
-            if job and job['status'] == JobStatus.QUEUED:
-                return job
+        with self._lock:
+            version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if stop_event.wait(min(config.QUEUE_POLL_INTERVAL, max(0, deadline - time.monotonic()))):
+                return False
+            with self._lock:
+                if self._conn.execute('PRAGMA data_version').fetchone()[0] != version:
+                    return True
+        return False
         
-        return None
+    def _update(self, job_id: str, updates: Dict) -> int:
+        """Run the UPDATE for update_job; caller holds the lock"""
+        columns = tuple(sorted(updates))
+        unknown = set(columns) - UPDATABLE_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+            
+        # One canonical statement per column set, reused from sqlite3's statement cache
+        query = self._update_sql_cache.get(columns)
+        if query is None:
+            query = f"UPDATE jobs SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?"
+            self._update_sql_cache[columns] = query
+            
+        cursor = self._conn.execute(
+            query,
+            [self._encode(c, updates[c]) for c in columns] + [job_id]
+        )
+        return cursor.rowcount
     
     def update_job(self, job_id: str, updates: Dict):
         """
@@ -105,15 +305,38 @@ class JobQueue:
             job_id: Job identifier
             updates: Dictionary with fields to update
         """
-        data = self._load_queue()
-        
-        if job_id not in data['jobs']:
+        if not updates:
+            return
+            
+        with self._lock:
+            updated = self._update(job_id, updates)
+            
+        if not updated:
             raise ValueError(f"Job {job_id} not found")
         
-        job = data['jobs'][job_id]
-        job.update(updates)
+    def update_job_video_data(self, job_id: str, patch: Dict):
+        """
+        Merge fields into a job's video_data inside SQLite
+        
+        Uses the JSON1 json_patch function (RFC 7396 merge: nested dicts are
+        merged, None removes a key), so the stored JSON is never read back
+        and re-encoded in Python.
         
-        self._save_queue(data)
+        Args:
+            job_id: Job identifier
+            patch: Fields to merge into video_data
+        """
+        if not patch:
+            return
+            
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET video_data = json_patch(COALESCE(video_data, '{}'), ?) WHERE id = ?",
+                (self._encode('video_data', patch), job_id)
+            )
+            
+        if not cursor.rowcount:
+            raise ValueError(f"Job {job_id} not found")
     
     def get_job(self, job_id: str) -> Optional[Dict]:
         """
@@ -125,8 +348,8 @@ class JobQueue:
         Returns:
             Job dict or None
         """
-        data = self._load_queue()
-        return data['jobs'].get(job_id)
+        jobs = self._select("WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
     
     def get_all_jobs(self) -> List[Dict]:
         """
@@ -135,8 +358,7 @@ class JobQueue:
         Returns:
             List of all jobs
         """
-        data = self._load_queue()
-        return list(data['jobs'].values())
+        return self._select()
     
     def get_queued_jobs(self) -> List[Dict]:
         """
@@ -145,11 +367,7 @@ class JobQueue:
         Returns:
             List of queued jobs
         """
-        data = self._load_queue()
-        return [
-            job for job in data['jobs'].values()
-            if job['status'] == JobStatus.QUEUED
-        ]
+        return self._select("WHERE status = ?", (JobStatus.QUEUED.value,))
     
     def get_processing_jobs(self) -> List[Dict]:
         """
@@ -158,11 +376,7 @@ class JobQueue:
         Returns:
             List of processing jobs
         """
-        data = self._load_queue()
-        return [
-            job for job in data['jobs'].values()
-            if job['status'] == JobStatus.PROCESSING
-        ]
+        return self._select("WHERE status = ?", (JobStatus.PROCESSING.value,))
     
     def get_queue_position(self, job_id: str) -> int:
         """
@@ -174,11 +388,17 @@ class JobQueue:
         Returns:
             Position (0-indexed) or -1 if not found or not queued
         """
-        queued_jobs = self.get_queued_jobs()
-        for i, job in enumerate(queued_jobs):
-            if job['id'] == job_id:
-                return i
-        return -1
+        # Count the queued jobs ahead of this one using idx_jobs_status_created
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT (
+                    SELECT COUNT(*) FROM jobs
+                    WHERE status = j.status AND created_at < j.created_at
+                )
+                FROM jobs j
+                WHERE j.id = ? AND j.status = ?
+            ''', (job_id, JobStatus.QUEUED.value)).fetchone()
+        return row[0] if row else -1
     
     def cleanup_old_jobs(self, days: int = 7):
         """
@@ -186,27 +406,16 @@ class JobQueue:
         
         Args:
             days: Number of days to keep jobs
+            
+        Returns:
+            Number of jobs removed
         """
-        from datetime import timedelta
-        
-        data = self._load_queue()
         cutoff_date = datetime.now() - timedelta(days=days)
         
-        jobs_to_remove = []
-        
-        for job_id, job in data['jobs'].items():
-            if job['status'] in [JobStatus.COMPLETED, JobStatus.FAILED]:
-                completed_at = job.get('completed_at')
-                if completed_at:
-                    job_date = datetime.fromisoformat(completed_at)
-                    if job_date < cutoff_date:
-                        jobs_to_remove.append(job_id)
-        
-        for job_id in jobs_to_remove:
-            del data['jobs'][job_id]
-            if job_id in data['queue']:
-                data['queue'].remove(job_id)
-        
-        self._save_queue(data)
-        
-        return len(jobs_to_remove)
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND completed_at < ?",
+                (JobStatus.COMPLETED.value, JobStatus.FAILED.value, cutoff_date.isoformat())
+            )
+            
+        return cursor.rowcount
@@ -0,0 +1,51 @@
+"""
+Logging Setup
+Routes log records through a queue so formatting and writing to the console
+happen on a background thread, not in request handlers or the worker loop
+"""
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import config
+
+LOG_FORMAT = '%(asctime)s %(levelname)-8s [%(name)s] %(message)s'
+
+_queue_handler = None
+_listener = None
+_listener_pid = None
+
+
+def setup_logging(level: str = None):
+    """
+    Send all log records through a QueueListener running in the background
+
+    Safe to call more than once. A process forked from one that already set up
+    logging replaces the inherited handler, since the listener thread isn't
+    carried over by fork.
+
+    Args:
+        level: Log level name (defaults to config.LOG_LEVEL)
+    """
+    global _queue_handler, _listener, _listener_pid
+
+    if _listener is not None and _listener_pid == os.getpid():
+        return
+
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+    atexit.register(_listener.stop)
+
+    root.addHandler(_queue_handler)
+    root.setLevel(level or config.LOG_LEVEL)
@@ -3,14 +3,54 @@ Narration Generator Module
 Handles text-to-speech conversion using ElevenLabs API with OpenAI TTS fallback
 """
 import os
+import re
 from pathlib import Path
-try:
-    from elevenlabs.client import ElevenLabs
-    ELEVENLABS_AVAILABLE = True
-except ImportError:
-    ELEVENLABS_AVAILABLE = False
-import openai
+from types import MappingProxyType
+from importlib.util import find_spec
+from typing import Tuple
 import config
+import asset_cache
+from http_clients import get_http_client, get_openai_client
+
+# Checked without importing; the SDK itself is imported only when used
+ELEVENLABS_AVAILABLE = find_spec('elevenlabs') is not None
+
+# Voice used when a request names a voice that isn't in config.VOICE_IDS/VOICE_ALIASES
+DEFAULT_VOICE = 'Sarah'
+
+ELEVENLABS_VOICE_ID = re.compile(r'^[A-Za-z0-9]{20}$')
+
+ELEVENLABS_MODEL = 'eleven_turbo_v2_5'
+OPENAI_TTS_MODEL = 'tts-1'
+
+# Map voice names to OpenAI voices (6 available: alloy, echo, fable, onyx, nova, shimmer)
+OPENAI_VOICES = MappingProxyType({
+    'Zara': 'nova',
+    'Shelby': 'shimmer',
+    'James': 'onyx',
+    'B.Giffen': 'fable',
+    'Adam': 'echo',
+    'Lulu Lollipop': 'alloy'
+})
+
+
+def resolve_voice(voice_name: str) -> Tuple[str, str]:
+    """
+    Resolve a voice name or alias to the canonical name and ElevenLabs ID
+
+    Args:
+        voice_name: Requested voice name
+
+    Returns:
+        (canonical voice name, voice ID), falling back to DEFAULT_VOICE for unknown names
+    """
+    canonical = config.VOICE_ALIASES.get(voice_name, voice_name)
+    voice_id = config.VOICE_IDS.get(canonical)
+    if voice_id is None:
+        print(f"Voice '{voice_name}' not found, using default '{DEFAULT_VOICE}'")
+        canonical = DEFAULT_VOICE
+        voice_id = config.VOICE_IDS[DEFAULT_VOICE]
+    return canonical, voice_id
 
 
 class NarrationGenerator:
@@ -20,18 +60,30 @@ class NarrationGenerator:
         """Initialize the narration generator"""
         self.use_elevenlabs = ELEVENLABS_AVAILABLE and bool(config.ELEVENLABS_API_KEY)
         if self.use_elevenlabs:
-            self.elevenlabs_client = ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
-        if config.OPENAI_API_KEY:
-            openai.api_key = config.OPENAI_API_KEY
+            from elevenlabs.client import ElevenLabs
+            self.elevenlabs_client = ElevenLabs(
+                api_key=config.ELEVENLABS_API_KEY,
+                httpx_client=get_http_client()
+            )
+        self.openai_client = get_openai_client()
         self.voices = config.VOICE_TYPES
+        
+        invalid = [name for name, voice_id in config.VOICE_IDS.items()
+                   if not ELEVENLABS_VOICE_ID.match(voice_id)]
+        if invalid:
+            print(f"Warning: malformed ElevenLabs voice IDs for: {', '.join(invalid)}")
     
-    def generate_narration(self, script: str, voice_name: str = 'Bella') -> Path:
+    def generate_narration(self, script: str, voice_name: str = DEFAULT_VOICE,
+                           run_id: str = '', force: bool = False) -> Path:
         """
         Generate narration from script
         
         Args:
             script: The text to convert to speech
             voice_name: Name of the voice to use
+            run_id: Optional identifier added to the file name so concurrent
+                runs don't overwrite each other's audio
+            force: Generate new audio even if an identical narration is cached
             
         Returns:
             Path to the generated audio file
@@ -39,22 +91,26 @@ class NarrationGenerator:
         # Try ElevenLabs first if API key is available
         if self.use_elevenlabs:
             try:
-                return self._generate_with_elevenlabs(script, voice_name)
+                return self._generate_with_elevenlabs(script, voice_name, run_id, force)
             except Exception as e:
                 print(f"ElevenLabs failed: {e}")
                 print("Falling back to OpenAI TTS...")
         
         # Fallback to OpenAI TTS
-        return self._generate_with_openai(script, voice_name)
+        return self._generate_with_openai(script, voice_name, run_id, force)
     
-    def _generate_with_elevenlabs(self, script: str, voice_name: str) -> Path:
+    def _generate_with_elevenlabs(self, script: str, voice_name: str, run_id: str = '',
+                                  force: bool = False) -> Path:
         """Generate narration using ElevenLabs"""
         # Get voice ID - use default if voice not found
-        if voice_name not in self.voices:
-            print(f"Voice '{voice_name}' not found, using default 'Zara'")
-            voice_name = 'Zara'
+        voice_name, voice_id = resolve_voice(voice_name)
         
-        voice_id = self.voices[voice_name]
+        tag = f"{run_id}_" if run_id else ""
+        output_path = config.AUDIO_DIR / f"narration_{tag}{voice_name}_elevenlabs.mp3"
+        cache_key = asset_cache.cache_key('elevenlabs', ELEVENLABS_MODEL, voice_id, script)
+        if not force and asset_cache.fetch(cache_key, '.mp3', output_path):
+            print(f"Narration reused from cache: {output_path}")
+            return output_path
         
         # Generate audio
         print(f"Generating narration with ElevenLabs ({voice_name} voice, ID: {voice_id})...")
@@ -63,45 +119,44 @@ class NarrationGenerator:
         audio = self.elevenlabs_client.text_to_speech.convert(
             voice_id=voice_id,
             text=script,
-            model_id="eleven_turbo_v2_5"
+            model_id=ELEVENLABS_MODEL
         )
         
-        # Save audio file
-        output_path = config.AUDIO_DIR / f"narration_{voice_name}_elevenlabs.mp3"
-        
-        # Convert generator to bytes and save
-        with open(output_path, 'wb') as f:
-            for chunk in audio:
-                f.write(chunk)
+        # Save audio file through a 1 MB buffer; writelines drives the
+        # chunk iterator from C instead of a Python-level loop
+        with open(output_path, 'wb', buffering=1 << 20) as f:
+            f.writelines(audio)
+        asset_cache.store(cache_key, '.mp3', output_path)
         
         print(f"Narration saved to {output_path}")
         return output_path
     
-    def _generate_with_openai(self, script: str, voice_name: str) -> Path:
+    def _generate_with_openai(self, script: str, voice_name: str, run_id: str = '',
+                              force: bool = False) -> Path:
         """Generate narration using OpenAI TTS as fallback"""
-        # Map voice names to OpenAI voices (6 available: alloy, echo, fable, onyx, nova, shimmer)
-        openai_voices = {
-            'Zara': 'nova',
-            'Shelby': 'shimmer',
-            'James': 'onyx',
-            'B.Giffen': 'fable',
-            'Adam': 'echo',
-            'Lulu Lollipop': 'alloy'
-        }
+        openai_voice = OPENAI_VOICES.get(voice_name, 'nova')
         
-        openai_voice = openai_voices.get(voice_name, 'nova')
+        tag = f"{run_id}_" if run_id else ""
+        output_path = config.AUDIO_DIR / f"narration_{tag}{voice_name}_openai.mp3"
+        cache_key = asset_cache.cache_key('openai', OPENAI_TTS_MODEL, openai_voice, script)
+        if not force and asset_cache.fetch(cache_key, '.mp3', output_path):
+            print(f"Narration reused from cache: {output_path}")
+            return output_path
         
         print(f"Generating narration with OpenAI TTS ({openai_voice} voice)...")
         
-        response = openai.audio.speech.create(
-            model="tts-1",
+        if self.openai_client is None:
+            raise ValueError("OpenAI API key is not configured")
+        
+        response = self.openai_client.audio.speech.create(
+            model=OPENAI_TTS_MODEL,
             voice=openai_voice,
             input=script
         )
         
         # Save audio file
-        output_path = config.AUDIO_DIR / f"narration_{voice_name}_openai.mp3"
         response.stream_to_file(str(output_path))
+        asset_cache.store(cache_key, '.mp3', output_path)
         
         print(f"Narration saved to {output_path}")
         return output_path
@@ -3,16 +3,27 @@ Video Generator Pipeline
 Main orchestrator for the complete video generation process
 """
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 import json
+import logging
+import shutil
+import subprocess
+import threading
 from datetime import datetime
-from narration_generator import NarrationGenerator
+import uuid
+from narration_generator import NarrationGenerator, DEFAULT_VOICE
 from prompt_generator import ImagePromptGenerator
 from image_generator import ImageGenerator
 from video_composer import VideoComposer
 from database import VideoDatabase
 import config
 
+logger = logging.getLogger(__name__)
+
+# Resolved once; None when ffprobe isn't on PATH
+FFPROBE = shutil.which('ffprobe')
+
 
 class VideoGeneratorPipeline:
     """
@@ -28,13 +39,15 @@ class VideoGeneratorPipeline:
     
     def __init__(self):
         """Initialize all components"""
+        config.ensure_dirs()
         self.narration_gen = NarrationGenerator()
         self.prompt_gen = ImagePromptGenerator()
         self.image_gen = ImageGenerator()
         self.video_composer = VideoComposer()
         self.db = VideoDatabase()
     
-    def generate_video(self, video_data: Dict) -> Dict:
+    def generate_video(self, video_data: Dict,
+                       progress_callback: Optional[Callable[[int, str], None]] = None) -> Dict:
         """
         Generate complete video from input data
         
@@ -46,48 +59,68 @@ class VideoGeneratorPipeline:
                 - style: Visual style
                 - voice: Voice type
                 - script: Video script
+            progress_callback: Optional callable receiving (progress, message)
+                as each step starts, used by the worker to update job status
                 
         Returns:
             Dictionary with video metadata and path
         """
+        def report(progress: int, message: str):
+            if progress_callback:
+                progress_callback(progress, message)
+        
         try:
             title = video_data.get('title', 'Untitled Video')
             category = video_data.get('category', 'General')
             video_format = video_data.get('format', '16:9')
             style = video_data.get('style', 'Modern Abstract')
-            voice = video_data.get('voice', 'Bella')
+            voice = video_data.get('voice', DEFAULT_VOICE)
             script = video_data.get('script', '')
             keywords = video_data.get('keywords', '')
             negative_keywords = video_data.get('negative_keywords', '')
             
-            print(f"\n{'='*60}")
-            print(f"STARTING VIDEO GENERATION: {title}")
-            print(f"{'='*60}\n")
+            # Unique ID for this run's intermediate files, so videos generated
+            # in parallel don't overwrite each other's audio and images
+            run_id = uuid.uuid4().hex[:8]
             
-            # STEP 1: Generate narration
-            print("STEP 1: Generating narration...")
-            audio_path = self.narration_gen.generate_narration(script, voice)
-            print(f"✓ Narration complete\n")
+            logger.info("[%s] Starting video generation: %s", run_id, title)
             
-            # STEP 2: Create image prompts
-            print("STEP 2: Creating image prompts...")
-            prompts = self.prompt_gen.generate_prompts(script, style, keywords, negative_keywords)
-            print(f"✓ Generated {len(prompts)} prompts\n")
-            
-            # STEP 3: Generate images
-            print("STEP 3: Generating images from prompts...")
-            image_paths = self.image_gen.generate_images(prompts, video_format)
-            print(f"✓ Generated {len(image_paths)} images\n")
+            # Narration doesn't depend on the prompts or images, so its TTS
+            # call runs in the background while steps 2 and 3 hit their APIs
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # STEP 1: Generate narration
+                report(15, 'Generating narration...')
+                logger.info("[%s] Step 1: generating narration (in background)", run_id)
+                narration_future = executor.submit(
+                    self.narration_gen.generate_narration, script, voice, run_id
+                )
+                
+                # STEP 2 & 3: Create image prompts and generate images. Prompts
+                # are streamed, so each image starts as soon as its prompt is
+                # written; pre-generated prompts (queue_manager.py
+                # batch-prompts) are used when present
+                report(30, 'Creating image prompts and generating images...')
+                logger.info("[%s] Steps 2-3: creating image prompts and generating images", run_id)
+                prompts = video_data.get('prompts') or self.prompt_gen.stream_prompts(
+                    script, style, keywords, negative_keywords
+                )
+                image_paths = self.image_gen.generate_images(prompts, video_format, run_id)
+                logger.info("[%s] Generated %d prompts and images", run_id, len(image_paths))
+                
+                audio_path = narration_future.result()
+                logger.info("[%s] Narration complete", run_id)
             
             # STEP 4 & 5: Combine images and narration with zoom/pan effects
-            print("STEP 4-5: Composing video with effects and AI subtitles...")
+            report(70, 'Composing video with effects and subtitles...')
+            logger.info("[%s] Steps 4-5: composing video with effects and AI subtitles", run_id)
             video_path = self.video_composer.create_video(
-                image_paths, audio_path, video_format, title, script
+                image_paths, audio_path, video_format, title, script, run_id
             )
-            print(f"✓ Video composed successfully with AI-powered subtitles\n")
+            logger.info("[%s] Video composed", run_id)
             
             # STEP 6: Save to database
-            print("STEP 6: Saving to database...")
+            report(95, 'Saving video...')
+            logger.info("[%s] Step 6: saving to database", run_id)
             video_metadata = {
                 'title': title,
                 'category': category,
@@ -105,17 +138,13 @@ class VideoGeneratorPipeline:
             
             video_id = self.db.add_video(video_metadata)
             video_metadata['id'] = video_id
-            print(f"✓ Saved to database (ID: {video_id})\n")
-            
-            print(f"{'='*60}")
-            print(f"VIDEO GENERATION COMPLETE!")
-            print(f"Output: {video_path}")
-            print(f"{'='*60}\n")
+            logger.info("[%s] Saved to database (ID: %s)", run_id, video_id)
+            logger.info("[%s] Video generation complete: %s", run_id, video_path)
             
             return video_metadata
             
         except Exception as e:
-            print(f"\n✗ Error in video generation pipeline: {e}")
+            logger.error("Error in video generation pipeline: %s", e)
             raise
     
     def get_all_videos(self) -> list:
@@ -124,26 +153,65 @@ class VideoGeneratorPipeline:
     
     def _get_video_duration(self, audio_path: Path) -> float:
         """Get duration of audio file"""
+        # ffprobe only reads the container header; it doesn't import
+        # MoviePy or start a decoder
+        if FFPROBE:
+            try:
+                result = subprocess.run(
+                    [FFPROBE, '-v', 'error', '-show_entries', 'format=duration',
+                     '-of', 'default=nk=1:nw=1', str(audio_path)],
+                    capture_output=True, text=True, timeout=30
+                )
+                return float(result.stdout)
+            except (OSError, ValueError, subprocess.SubprocessError):
+                pass
+        
+        # MoviePy ships its own ffmpeg but not ffprobe
         try:
-            from moviepy import AudioClip
-            audio = AudioClip(str(audio_path))
+            from moviepy import AudioFileClip
+            audio = AudioFileClip(str(audio_path))
             duration = audio.duration
             audio.close()
             return duration
-        except:
+        except Exception:
             return 0.0
 
 
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> VideoGeneratorPipeline:
+    """
+    Get the process-wide pipeline, building it on first use
+
+    The generators and their API clients (with warm connection pools) are
+    then reused by every video generated in this process.
+
+    Returns:
+        Shared VideoGeneratorPipeline
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = VideoGeneratorPipeline()
+    return _pipeline
+
+
 if __name__ == "__main__":
+    from logging_config import setup_logging
+    setup_logging()
+    
     # Test the pipeline
-    pipeline = VideoGeneratorPipeline()
+    pipeline = get_pipeline()
     
     test_data = {
         'title': 'Test Video',
         'category': 'Test',
         'format': '16:9',
         'style': 'Modern Abstract',
-        'voice': 'Bella',
+        'voice': DEFAULT_VOICE,
         'script': 'This is a test video script. It will be converted into an amazing video with AI.'
     }
     
@@ -2,9 +2,167 @@
 Image Prompt Generator Module
 Creates detailed image prompts from script using OpenAI GPT
 """
-from openai import OpenAI
+import json
+import re
+import time
+from bisect import bisect_right
+from itertools import islice
 import config
-from typing import List, Dict
+import asset_cache
+from http_clients import get_openai_client
+from typing import Iterator, List, Dict, Optional
+
+# Upper bound on completion tokens for one prompt/negative_prompt pair
+TOKENS_PER_PROMPT = 150
+
+# Image count by script length, as (words per image, offset, min, max):
+# Short (0-100 words): 3-5 images
+# Medium (100-300 words): 5-7 images
+# Long (300-500 words): 7-10 images
+# Very long (500+ words): 10-12 images
+IMAGE_COUNT_TIER_LIMITS = (100, 300, 500)
+IMAGE_COUNT_TIERS = (
+    (20, 2, 3, 5),
+    (40, 3, 5, 7),
+    (50, 4, 7, 10),
+    (60, 5, 10, 12)
+)
+
+# Negative prompt terms every image gets
+TEXT_EXCLUSIONS = "text, letters, words, writing, typography, captions, subtitles, labels, signs, banners, written language, alphabet, numbers, symbols"
+QUALITY_EXCLUSIONS = "blurry, low quality, distorted, watermark, logo, signature, jpeg artifacts, pixelated, grainy"
+BASE_NEGATIVE_PROMPT = f"{TEXT_EXCLUSIONS}, {QUALITY_EXCLUSIONS}"
+
+# Negative prompt of the fallback prompts used when generation fails
+DEFAULT_NEGATIVE_PROMPT = "text, letters, words, writing, typography, captions, subtitles, labels, signs, blurry, low quality, distorted, ugly, bad anatomy, watermark"
+
+# Kept free of per-request values so every request shares the same prefix,
+# which OpenAI's prompt caching can reuse; the values go in the user message
+SYSTEM_PROMPT = """You are an expert at creating detailed image prompts for AI image generation.
+The user message starts with these settings, one per line, followed by the script:
+COUNT: how many image prompts to create
+STYLE: the visual style for every image
+KEYWORDS: keywords to include, or "none"
+NEGATIVE: the negative prompt to use for every image
+
+Your task is to create exactly COUNT unique image prompts based on the provided script.
+
+Requirements:
+1. Each prompt should represent a key scene or moment from the script
+2. Use the STYLE
+3. Include the KEYWORDS; if there are none, use vivid, descriptive language
+4. Make prompts detailed and vivid
+5. Each prompt should be 1-2 sentences
+6. IMPORTANT: Do NOT include any text, letters, words, or writing in the scene descriptions
+7. Focus on visual elements: people, objects, landscapes, atmosphere, lighting, colors
+8. Use NEGATIVE as the negative_prompt of every prompt
+
+Return ONLY a JSON object with this exact format:
+{
+    "prompts": [
+        {
+            "prompt": "detailed scene description in the STYLE, no text, no letters, no words",
+            "negative_prompt": "the NEGATIVE value"
+        },
+        ...
+    ]
+}
+"""
+
+USER_PROMPT_TEMPLATE = """COUNT: {image_count}
+STYLE: {style}
+KEYWORDS: {keywords}
+NEGATIVE: {negative_prompt}
+Script: {script}"""
+
+# Scripts sent together to generate_prompts_multi; more risks truncated output
+MAX_SCRIPTS_PER_CALL = 4
+
+MULTI_SYSTEM_PROMPT = """You are an expert at creating detailed image prompts for AI image generation.
+You will receive a JSON array of scripts. Each entry has an id, image_count, style, keywords, negative_prompt and script.
+For each entry, create exactly image_count unique image prompts based on its script.
+
+Requirements:
+1. Each prompt should represent a key scene or moment from its script
+2. Use the entry's style
+3. Include the entry's keywords; if there are none, use vivid, descriptive language
+4. Make prompts detailed and vivid
+5. Each prompt should be 1-2 sentences
+6. IMPORTANT: Do NOT include any text, letters, words, or writing in the scene descriptions
+7. Focus on visual elements: people, objects, landscapes, atmosphere, lighting, colors
+8. Use the entry's negative_prompt as the negative_prompt of each of its prompts
+
+Return ONLY a JSON object with this exact format:
+{
+    "results": [
+        {
+            "id": "the entry's id",
+            "prompts": [
+                {
+                    "prompt": "detailed scene description in the entry's style, no text, no letters, no words",
+                    "negative_prompt": "the entry's negative_prompt"
+                },
+                ...
+            ]
+        },
+        ...
+    ]
+}
+"""
+
+_CODE_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*$', re.MULTILINE)
+_JSON_ARRAY_RE = re.compile(r'\[[\s\S]*\]')
+
+
+class _PromptStreamParser:
+    """
+    Incrementally pull prompt objects out of a streamed JSON response
+
+    Tracks nesting depth and string state character by character, so each
+    object inside the "prompts" array is decoded as soon as its closing
+    brace arrives.
+    """
+
+    # Depth of an item inside {"prompts": [ ... ]}
+    ITEM_DEPTH = 3
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """
+        Consume the next piece of the response
+
+        Returns:
+            Prompt dicts completed by this piece, in order
+        """
+        completed = []
+        for char in text:
+            if self._depth >= self.ITEM_DEPTH:
+                self._buffer.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+                if self._depth == self.ITEM_DEPTH:
+                    self._buffer = [char]
+            elif char in '}]':
+                if self._depth == self.ITEM_DEPTH:
+                    completed.append(json.loads(''.join(self._buffer)))
+                    self._buffer = []
+                self._depth -= 1
+        return completed
 
 
 class ImagePromptGenerator:
@@ -12,26 +170,79 @@ class ImagePromptGenerator:
     
     def __init__(self):
         """Initialize the prompt generator"""
-        self.client = OpenAI(api_key=config.OPENAI_API_KEY) if config.OPENAI_API_KEY else None
+        self.client = get_openai_client()
+    
+    def _calculate_image_count(self, word_count: int) -> int:
+        """Calculate optimal number of images based on script length in words"""
+        words_per_image, offset, low, high = IMAGE_COUNT_TIERS[bisect_right(IMAGE_COUNT_TIER_LIMITS, word_count)]
+        return max(low, min(high, word_count // words_per_image + offset))
     
-    def _calculate_image_count(self, script: str) -> int:
-        """Calculate optimal number of images based on script length"""
-        word_count = len(script.split())
-        
-        # Calculate based on script length:
-        # Short (0-100 words): 3-5 images
-        # Medium (100-300 words): 5-7 images
-        # Long (300-500 words): 7-10 images
-        # Very long (500+ words): 10-12 images
-        
-        if word_count < 100:
-            return max(3, min(5, word_count // 20 + 2))
-        elif word_count < 300:
-            return max(5, min(7, word_count // 40 + 3))
-        elif word_count < 500:
-            return max(7, min(10, word_count // 50 + 4))
+    def _build_request(self, script: str, style: str, keywords: str,
+                       negative_keywords: str, image_count: int) -> Dict:
+        """
+        Build the chat completion request for a script
+        
+        Returns:
+            Keyword arguments for chat.completions.create
+        """
+        # Create comprehensive negative prompt that excludes text
+        if negative_keywords:
+            negative_prompt = f"{BASE_NEGATIVE_PROMPT}, {negative_keywords}"
         else:
-            return max(10, min(12, word_count // 60 + 5))
+            negative_prompt = BASE_NEGATIVE_PROMPT
+        
+        user_prompt = USER_PROMPT_TEMPLATE.format_map({
+            'image_count': image_count,
+            'style': style,
+            'keywords': keywords or 'none',
+            'negative_prompt': negative_prompt,
+            'script': script
+        })
+        
+        return {
+            'model': config.PROMPT_MODEL,
+            'messages': [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            'temperature': 0.8,
+            # Enough for every prompt object; a lower cap ends generation sooner
+            'max_tokens': TOKENS_PER_PROMPT * image_count + 100,
+            'response_format': {"type": "json_object"}
+        }
+    
+    def _load_json(self, content: str):
+        """Decode a model response as JSON"""
+        # JSON mode normally returns a bare object; tolerate Markdown code
+        # fences and prose around the JSON from models without it
+        try:
+            return json.loads(content)
+        except ValueError:
+            content = _CODE_FENCE_RE.sub('', content)
+            try:
+                return json.loads(content)
+            except ValueError:
+                match = _JSON_ARRAY_RE.search(content)
+                if not match:
+                    raise
+                return json.loads(match.group())
+    
+    def _parse_prompts(self, content: str, image_count: int) -> List[Dict[str, str]]:
+        """Extract the prompt list from a model response, padded or trimmed to image_count"""
+        data = self._load_json(content)
+        return self._fit_prompts(data['prompts'] if isinstance(data, dict) else data, image_count)
+    
+    def _fit_prompts(self, prompts: List[Dict[str, str]], image_count: int) -> List[Dict[str, str]]:
+        """Pad or trim a non-empty prompt list to image_count"""
+        # Ensure we have exactly the right number of prompts
+        if len(prompts) < image_count:
+            # Duplicate some prompts if needed
+            while len(prompts) < image_count:
+                prompts.append(prompts[-1])
+        elif len(prompts) > image_count:
+            prompts = prompts[:image_count]
+        
+        return prompts
     
     def generate_prompts(self, script: str, style: str = 'Modern Abstract', 
                         keywords: str = '', negative_keywords: str = '') -> List[Dict[str, str]]:
@@ -47,102 +258,232 @@ class ImagePromptGenerator:
         Returns:
             List of dictionaries containing prompts and negative prompts
         """
-        try:
-            # Calculate dynamic image count based on script length
-            image_count = self._calculate_image_count(script)
-            print(f"Script has {len(script.split())} words, generating {image_count} images")
-            
-            # Create comprehensive negative prompt that excludes text
-            text_exclusions = "text, letters, words, writing, typography, captions, subtitles, labels, signs, banners, written language, alphabet, numbers, symbols"
-            quality_exclusions = "blurry, low quality, distorted, watermark, logo, signature, jpeg artifacts, pixelated, grainy"
-            
-            if negative_keywords:
-                negative_prompt_base = f"{text_exclusions}, {quality_exclusions}, {negative_keywords}"
-            else:
-                negative_prompt_base = f"{text_exclusions}, {quality_exclusions}"
-            
-            keywords_instruction = f"Include these keywords: {keywords}" if keywords else "Use vivid, descriptive language"
+        return list(self.stream_prompts(script, style, keywords, negative_keywords))
+    
+    def stream_prompts(self, script: str, style: str = 'Modern Abstract',
+                       keywords: str = '', negative_keywords: str = '') -> Iterator[Dict[str, str]]:
+        """
+        Generate image prompts from script, yielding each one as soon as the
+        model has finished writing it
+        
+        Lets the caller start generating the first images while the rest of
+        the prompts are still being decoded. Always yields exactly the image
+        count for the script, falling back to default prompts on errors.
+        
+        Args:
+            script: The video script
+            style: Visual style for images
+            keywords: Additional keywords to include
+            negative_keywords: Keywords to avoid in images
             
-            system_prompt = f"""You are an expert at creating detailed image prompts for AI image generation.
-Your task is to create exactly {image_count} unique image prompts based on the provided script.
-
-Requirements:
-1. Each prompt should represent a key scene or moment from the script
-2. Use the style: {style}
-3. {keywords_instruction}
-4. Make prompts detailed and vivid
-5. Each prompt should be 1-2 sentences
-6. IMPORTANT: Do NOT include any text, letters, words, or writing in the scene descriptions
-7. Focus on visual elements: people, objects, landscapes, atmosphere, lighting, colors
-8. For negative prompts, always include: {negative_prompt_base}
-
-Return ONLY a JSON array with this exact format:
-[
-    {{
-        "prompt": "detailed scene description in {style} style, no text, no letters, no words",
-        "negative_prompt": "{negative_prompt_base}"
-    }},
-    ...
-]
-"""
+        Yields:
+            Dictionaries containing prompt and negative_prompt
+        """
+        # Identical requests get the prompts generated the first time
+        cache_key = asset_cache.cache_key(
+            'prompts', config.PROMPT_MODEL, script, style, keywords, negative_keywords
+        )
+        cached = asset_cache.load_json(cache_key)
+        if cached:
+            print(f"Reusing {len(cached)} cached image prompts")
+            yield from cached
+            return
+        
+        # Split once; the word list sizes the request and the fallback prompts
+        words = script.split()
+        image_count = self._calculate_image_count(len(words))
+        prompts = []
+        try:
+            request = self._build_request(script, style, keywords, negative_keywords, image_count)
+            print(f"Script has {len(words)} words, generating {image_count} images")
             
             print(f"Generating {image_count} image prompts...")
             
             # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Script: {script}"}
-                ],
-                temperature=0.8,
-                max_tokens=2000
-            )
-            
-            # Parse response
-            import json
-            content = response.choices[0].message.content
-            
-            # Extract JSON from response
-            start_idx = content.find('[')
-            end_idx = content.rfind(']') + 1
-            json_str = content[start_idx:end_idx]
+            response = self.client.chat.completions.create(stream=True, **request)
+            parser = _PromptStreamParser()
+            try:
+                for chunk in response:
+                    if len(prompts) == image_count:
+                        break
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    for prompt in parser.feed(chunk.choices[0].delta.content)[:image_count - len(prompts)]:
+                        yield prompt
+                        prompts.append(prompt)
+            finally:
+                response.close()
             
-            prompts = json.loads(json_str)
+            if not prompts:
+                raise ValueError("No prompts in response")
             
             # Ensure we have exactly the right number of prompts
-            if len(prompts) < image_count:
+            while len(prompts) < image_count:
                 # Duplicate some prompts if needed
-                while len(prompts) < image_count:
-                    prompts.append(prompts[-1])
-            elif len(prompts) > image_count:
-                prompts = prompts[:image_count]
+                yield prompts[-1]
+                prompts.append(prompts[-1])
             
             print(f"Generated {len(prompts)} image prompts")
-            return prompts
+            asset_cache.store_json(cache_key, prompts)
             
         except Exception as e:
             print(f"Error generating prompts: {e}")
-            # Return default prompts as fallback
-            return self._generate_default_prompts(script, style, image_count)
+            # Return default prompts as fallback, for the ones not yet produced
+            yield from self._generate_default_prompts(words, style, image_count)[len(prompts):]
     
-    def _generate_default_prompts(self, script: str, style: str, image_count: int = None) -> List[Dict[str, str]]:
-        """Generate simple default prompts as fallback"""
-        if image_count is None:
-            image_count = self._calculate_image_count(script)
+    def generate_prompts_multi(self, requests: Dict[str, Dict[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Generate prompts for several scripts with one chat completion per
+        MAX_SCRIPTS_PER_CALL scripts
+        
+        Saves requests and round-trips when the API is limited by requests
+        per minute rather than tokens.
+        
+        Args:
+            requests: Maps an ID (e.g. job ID) to generate_prompts keyword
+                arguments: script, and optionally style, keywords, negative_keywords
             
-        words = script.split()
+        Returns:
+            Maps each ID the model answered for to its prompts; missing IDs
+            can fall back to generate_prompts
+        """
+        if not requests or self.client is None:
+            return {}
+        
+        entries = []
+        for custom_id, params in requests.items():
+            negative_keywords = params.get('negative_keywords', '')
+            entries.append({
+                'id': custom_id,
+                'image_count': self._calculate_image_count(len(params['script'].split())),
+                'style': params.get('style', 'Modern Abstract'),
+                'keywords': params.get('keywords', ''),
+                'negative_prompt': (f"{BASE_NEGATIVE_PROMPT}, {negative_keywords}"
+                                    if negative_keywords else BASE_NEGATIVE_PROMPT),
+                'script': params['script']
+            })
+        
+        results = {}
+        for start in range(0, len(entries), MAX_SCRIPTS_PER_CALL):
+            group = entries[start:start + MAX_SCRIPTS_PER_CALL]
+            image_counts = {entry['id']: entry['image_count'] for entry in group}
+            print(f"Generating prompts for {len(group)} scripts in one request...")
+            try:
+                response = self.client.chat.completions.create(
+                    model=config.PROMPT_MODEL,
+                    messages=[
+                        {"role": "system", "content": MULTI_SYSTEM_PROMPT},
+                        {"role": "user", "content": json.dumps(group, ensure_ascii=False)}
+                    ],
+                    temperature=0.8,
+                    max_tokens=TOKENS_PER_PROMPT * sum(image_counts.values()) + 100 * len(group),
+                    response_format={"type": "json_object"}
+                )
+                data = self._load_json(response.choices[0].message.content)
+                for result in data['results']:
+                    custom_id = str(result.get('id'))
+                    if custom_id in image_counts and result.get('prompts'):
+                        results[custom_id] = self._fit_prompts(result['prompts'], image_counts[custom_id])
+            except Exception as e:
+                print(f"Error generating prompts for {len(group)} scripts: {e}")
+        
+        print(f"Generated prompts for {len(results)}/{len(entries)} scripts")
+        return results
+    
+    def generate_prompts_batch(self, requests: Dict[str, Dict[str, str]],
+                               poll_interval: float = 30.0,
+                               timeout: Optional[float] = None) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Generate prompts for many scripts through the OpenAI Batch API
+        
+        Batch requests cost half as much as live calls but may take up to
+        24 hours, so this suits jobs that are queued well ahead of time.
+        
+        Args:
+            requests: Maps an ID (e.g. job ID) to generate_prompts keyword
+                arguments: script, and optionally style, keywords, negative_keywords
+            poll_interval: Seconds between batch status checks
+            timeout: Give up waiting after this many seconds (None waits for
+                the 24h completion window)
+            
+        Returns:
+            Maps each ID whose request succeeded to its prompts; failed or
+            unfinished requests are left out so callers can fall back to
+            generate_prompts
+        """
+        if not requests or self.client is None:
+            return {}
+        
+        image_counts = {}
+        lines = []
+        for custom_id, params in requests.items():
+            image_counts[custom_id] = self._calculate_image_count(len(params['script'].split()))
+            body = self._build_request(
+                params['script'],
+                params.get('style', 'Modern Abstract'),
+                params.get('keywords', ''),
+                params.get('negative_keywords', ''),
+                image_counts[custom_id]
+            )
+            lines.append(json.dumps({
+                'custom_id': custom_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': body
+            }))
+        
+        batch_file = self.client.files.create(
+            file=('prompts.jsonl', '\n'.join(lines).encode('utf-8')),
+            purpose='batch'
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        print(f"Submitted prompt batch {batch.id} with {len(lines)} requests")
+        
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            if deadline is not None and time.monotonic() >= deadline:
+                print(f"Prompt batch {batch.id} still {batch.status}, giving up waiting")
+                return {}
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        if not batch.output_file_id:
+            print(f"Prompt batch {batch.id} ended with status {batch.status}")
+            return {}
+        
+        results = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                custom_id = item['custom_id']
+                content = item['response']['body']['choices'][0]['message']['content']
+                results[custom_id] = self._parse_prompts(content, image_counts[custom_id])
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                print(f"Skipping unusable batch result: {e}")
+        
+        print(f"Prompt batch {batch.id} returned prompts for {len(results)}/{len(lines)} requests")
+        return results
+    
+    def _generate_default_prompts(self, words: List[str], style: str,
+                                  image_count: int) -> List[Dict[str, str]]:
+        """Generate simple default prompts from the script's words as fallback"""
         chunk_size = max(1, len(words) // image_count)
         
+        # Consecutive chunks from one iterator; the last takes the remainder
+        remaining = iter(words)
         prompts = []
         for i in range(image_count):
-            start = i * chunk_size
-            end = start + chunk_size if i < image_count - 1 else len(words)
-            chunk = ' '.join(words[start:end])
+            chunk = ' '.join(islice(remaining, chunk_size if i < image_count - 1 else None))
             
             prompts.append({
                 "prompt": f"{chunk[:100]} in {style} style, high quality, detailed, no text, no letters",
-                "negative_prompt": "text, letters, words, writing, typography, captions, subtitles, labels, signs, blurry, low quality, distorted, ugly, bad anatomy, watermark"
+                "negative_prompt": DEFAULT_NEGATIVE_PROMPT
             })
         
         return prompts
@@ -3,19 +3,24 @@ Queue Management CLI Tool
 Manage and monitor the job queue
 """
 import argparse
-from job_queue import JobQueue
+import os
+import sys
 from datetime import datetime
-import json
+
+ROW_FMT = "{:<38} {:<12} {:<10} {:<20} {:<20}\n"
 
 
 def format_timestamp(iso_string):
     """Format ISO timestamp to readable string"""
     if not iso_string:
         return "N/A"
+    # Jobs store datetime.isoformat() output, so the common case is a slice
+    if len(iso_string) >= 19 and iso_string[10] == 'T':
+        return f"{iso_string[:10]} {iso_string[11:19]}"
     try:
         dt = datetime.fromisoformat(iso_string)
         return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except:
+    except (TypeError, ValueError):
         return iso_string
 
 
@@ -31,17 +36,20 @@ def list_jobs(queue, status=None):
         return
     
     print(f"\n{'='*100}")
-    print(f"{'ID':<38} {'Status':<12} {'Progress':<10} {'Created':<20} {'Title':<20}")
+    print(ROW_FMT.format('ID', 'Status', 'Progress', 'Created', 'Title'), end='')
     print(f"{'='*100}")
     
-    for job in jobs:
-        job_id = job['id'][:36]
-        status = job['status']
-        progress = f"{job['progress']}%"
-        created = format_timestamp(job['created_at'])
-        title = job['video_data'].get('title', 'N/A')[:18]
-        
-        print(f"{job_id:<38} {status:<12} {progress:<10} {created:<20} {title:<20}")
+    # One buffered write for all rows instead of a print per job
+    sys.stdout.writelines(
+        ROW_FMT.format(
+            job['id'][:36],
+            job['status'],
+            f"{job['progress']}%",
+            format_timestamp(job['created_at']),
+            job['video_data'].get('title', 'N/A')[:18]
+        )
+        for job in jobs
+    )
     
     print(f"{'='*100}")
     print(f"Total: {len(jobs)} jobs")
@@ -107,30 +115,85 @@ def show_job(queue, job_id):
         print(f"  {job['error'][:200]}...")
 
 
+def watch_queue(queue):
+    """Show queue status, redrawing only when another process changes the queue"""
+    try:
+        while True:
+            show_queue(queue)
+            # Waits on SQLite's data_version instead of re-reading every job
+            while not queue.wait_for_change(60):
+                pass
+    except KeyboardInterrupt:
+        pass
+
+
 def cleanup_jobs(queue, days):
     """Clean up old jobs"""
     removed = queue.cleanup_old_jobs(days)
     print(f"Removed {removed} old jobs (older than {days} days)")
 
 
+def batch_prompts(queue, timeout=None, live=False):
+    """
+    Pre-generate image prompts for queued jobs
+    
+    Uses the OpenAI Batch API (half price, may take hours), or with live=True
+    one chat completion per few jobs.
+    """
+    from prompt_generator import ImagePromptGenerator
+    
+    requests = {
+        job['id']: job['video_data']
+        for job in queue.get_queued_jobs()
+        if 'prompts' not in job['video_data']
+    }
+    if not requests:
+        print("No queued jobs need prompts.")
+        return
+    
+    print(f"Batching prompts for {len(requests)} queued jobs...")
+    generator = ImagePromptGenerator()
+    if live:
+        results = generator.generate_prompts_multi(requests)
+    else:
+        results = generator.generate_prompts_batch(requests, timeout=timeout)
+    
+    stored = 0
+    for job_id, prompts in results.items():
+        try:
+            queue.update_job_video_data(job_id, {'prompts': prompts})
+            stored += 1
+        except ValueError:
+            pass  # Job was removed while the batch ran
+    print(f"Stored prompts for {stored} jobs")
+
+
 def main():
     parser = argparse.ArgumentParser(description='Manage ClipForge job queue')
-    parser.add_argument('command', choices=['list', 'queue', 'show', 'cleanup'],
+    parser.add_argument('command', choices=['list', 'queue', 'watch', 'show', 'cleanup', 'batch-prompts'],
                        help='Command to execute')
     parser.add_argument('--status', choices=['queued', 'processing', 'completed', 'failed'],
                        help='Filter jobs by status')
     parser.add_argument('--job-id', help='Job ID for show command')
     parser.add_argument('--days', type=int, default=7,
                        help='Days to keep jobs for cleanup command')
+    parser.add_argument('--timeout', type=float,
+                       help='Seconds to wait for the batch-prompts command (default: until done)')
+    parser.add_argument('--live', action='store_true',
+                       help='batch-prompts: group jobs into live requests instead of the Batch API')
     
     args = parser.parse_args()
     
+    # Imported after parsing so --help and usage errors return immediately
+    from job_queue import JobQueue
     queue = JobQueue()
     
     if args.command == 'list':
         list_jobs(queue, args.status)
     elif args.command == 'queue':
         show_queue(queue)
+    elif args.command == 'watch':
+        watch_queue(queue)
     elif args.command == 'show':
         if not args.job_id:
             print("Error: --job-id required for show command")
@@ -138,7 +201,15 @@ def main():
         show_job(queue, args.job_id)
     elif args.command == 'cleanup':
         cleanup_jobs(queue, args.days)
+    elif args.command == 'batch-prompts':
+        batch_prompts(queue, args.timeout, args.live)
 
 
 if __name__ == '__main__':
-    main()
+    try:
+        main()
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # Output was piped into something like `head` that exited early
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
@@ -2,11 +2,21 @@
 Subtitle Generator Module
 Generates intelligent, timed subtitles using AI
 """
-import openai
 import config
-from typing import List, Dict
+import asset_cache
+from http_clients import get_openai_client
+from typing import List, Dict, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import json
 import re
+import numpy as np
+
+# Segmentation requests in flight at once in generate_subtitle_segments_batch
+MAX_CONCURRENT_REQUESTS = 8
+
+# Sentence ends, and natural breaks for splitting long sentences
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_CLAUSE_BREAK_RE = re.compile(r',\s*|\s+and\s+|\s+but\s+|\s+or\s+')
 
 
 class SubtitleGenerator:
@@ -14,8 +24,8 @@ class SubtitleGenerator:
     
     def __init__(self):
         """Initialize the subtitle generator"""
-        if config.OPENAI_API_KEY:
-            openai.api_key = config.OPENAI_API_KEY
+        self.client = get_openai_client()
+        self.fps = config.DEFAULT_FPS
     
     def generate_subtitle_segments(self, script: str, audio_duration: float, 
                                    num_images: int = 7) -> List[Dict]:
@@ -44,6 +54,28 @@ class SubtitleGenerator:
             # Fallback to simple word-based segmentation
             return self._fallback_segmentation(script, audio_duration)
     
+    def generate_subtitle_segments_batch(self, requests: List[Tuple[str, float, int]]) -> List[List[Dict]]:
+        """
+        Generate subtitle segments for several scripts with their API calls
+        in flight concurrently
+        
+        The calls are network-bound, so the batch takes about as long as
+        its slowest request instead of the sum of all of them.
+        
+        Args:
+            requests: (script, audio_duration, num_images) per video
+            
+        Returns:
+            Subtitle segments for each request, in the same order
+        """
+        if not requests:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(len(requests), MAX_CONCURRENT_REQUESTS)) as executor:
+            return list(executor.map(
+                lambda request: self.generate_subtitle_segments(*request), requests
+            ))
+    
     def _ai_segment_script(self, script: str, num_scenes: int) -> List[str]:
         """
         Use OpenAI to intelligently break script into subtitle segments
@@ -68,33 +100,37 @@ IMPORTANT: Include EVERY word from the script - do not omit any text.
 Script:
 {script}
 
-Return ONLY a JSON array of strings (no extra text):
-["segment 1", "segment 2", ...]"""
+Return a JSON object: {{"segments": ["segment 1", "segment 2", ...]}}"""
 
+        # The segmentation depends only on the script and model, not on num_scenes
+        cache_key = asset_cache.cache_key('subtitles', config.SUBTITLE_MODEL, script)
+        segments = asset_cache.load_json(cache_key)
+        if segments:
+            print(f"Reusing {len(segments)} cached subtitle segments")
+            return segments
+        
         try:
-            response = openai.chat.completions.create(
+            if self.client is None:
+                raise ValueError("OpenAI API key is not configured")
+            
+            response = self.client.chat.completions.create(
                 model=config.SUBTITLE_MODEL,
                 messages=[
                     {"role": "system", "content": "You are an expert video subtitle creator. Create concise, readable subtitle segments that match natural speech patterns."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=2000
+                # The segments repeat the script, plus JSON quoting
+                max_tokens=min(2000, max(200, len(script.split()) * 3)),
+                response_format={"type": "json_object"}
             )
             
-            content = response.choices[0].message.content.strip()
-            
-            # Extract JSON array from response
-            # Handle cases where AI adds markdown code blocks
-            content = re.sub(r'^```json\s*', '', content)
-            content = re.sub(r'\s*```$', '', content)
-            content = content.strip()
-            
-            segments = json.loads(content)
+            segments = json.loads(response.choices[0].message.content).get('segments')
             
             # Validate segments
             if isinstance(segments, list) and len(segments) > 0:
                 print(f"AI generated {len(segments)} subtitle segments")
+                asset_cache.store_json(cache_key, segments)
                 return segments
             else:
                 raise ValueError("Invalid segment format from AI")
@@ -116,7 +152,7 @@ Return ONLY a JSON array of strings (no extra text):
             List of text segments
         """
         # Split by sentences
-        sentences = re.split(r'[.!?]+', script)
+        sentences = _SENTENCE_END_RE.split(script)
         sentences = [s.strip() for s in sentences if s.strip()]
         
         # If we have roughly the right number, use them
@@ -129,7 +165,7 @@ Return ONLY a JSON array of strings (no extra text):
             words = sentence.split()
             if len(words) > 15:
                 # Split long sentences at natural breaks (commas, conjunctions)
-                parts = re.split(r',\s*|\s+and\s+|\s+but\s+|\s+or\s+', sentence)
+                parts = _CLAUSE_BREAK_RE.split(sentence)
                 segments.extend([p.strip() for p in parts if p.strip()])
             else:
                 segments.append(sentence)
@@ -146,42 +182,42 @@ Return ONLY a JSON array of strings (no extra text):
             total_duration: Total audio duration in seconds
             
         Returns:
-            List of dictionaries with 'text', 'start_time', 'end_time'
+            List of dictionaries with 'text', 'start_time', 'end_time', with
+            times on the video's frame boundaries
         """
         if not segments:
             return []
         
-        timed_segments = []
-        
         # Calculate word count for each segment
-        word_counts = [len(segment.split()) for segment in segments]
-        total_words = sum(word_counts)
+        word_counts = np.fromiter((len(segment.split()) for segment in segments),
+                                  dtype=np.int64, count=len(segments))
+        total_words = word_counts.sum()
+        if not total_words:
+            raise ValueError("Subtitle segments contain no words")
         
         # Allocate time proportionally based on word count
-        current_time = 0.0
+        # Average speaking rate: 150-160 words per minute
+        # Minimum subtitle duration: 0.8 seconds
+        # Maximum subtitle duration: 5 seconds
+        durations = np.clip(word_counts / total_words * total_duration, 0.8, 5.0)
         
-        for i, (segment, word_count) in enumerate(zip(segments, word_counts)):
-            # Calculate duration based on word proportion
-            # Average speaking rate: 150-160 words per minute
-            duration = (word_count / total_words) * total_duration
-            
-            # Minimum subtitle duration: 0.8 seconds
-            # Maximum subtitle duration: 5 seconds
-            duration = max(0.8, min(5.0, duration))
-            
-            end_time = min(current_time + duration, total_duration)
-            
-            timed_segments.append({
+        # Each segment starts where the previous one ended, capped at the end of
+        # the audio; snapping to the nearest frame matches when the subtitle
+        # actually appears in the rendered video
+        end_times = np.minimum(np.rint(np.cumsum(durations) * self.fps) / self.fps, total_duration)
+        start_times = np.concatenate(([0.0], end_times[:-1]))
+        
+        timed_segments = [
+            {
                 'text': segment.strip(),
-                'start_time': round(current_time, 2),
-                'end_time': round(end_time, 2)
-            })
-            
-            current_time = end_time
+                'start_time': start_time,
+                'end_time': end_time
+            }
+            for segment, start_time, end_time in zip(segments, start_times.tolist(), end_times.tolist())
+        ]
         
         # Adjust last segment to match total duration exactly
-        if timed_segments:
-            timed_segments[-1]['end_time'] = total_duration
+        timed_segments[-1]['end_time'] = total_duration
         
         return timed_segments
     
@@ -199,11 +235,12 @@ Return ONLY a JSON array of strings (no extra text):
         """
         words = script.split()
         
-        # Create segments of 4-8 words each
-        segments = []
-        for i in range(0, len(words), 6):
-            segment_words = words[i:i+6]
-            segments.append(' '.join(segment_words))
+        # Create segments of 4-8 words each, about 2.5 seconds of speech
+        if audio_duration > 0:
+            chunk_size = max(4, min(8, round(len(words) / audio_duration * 2.5)))
+        else:
+            chunk_size = 6
+        segments = [' '.join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
         
         return self._calculate_timings(segments, audio_duration)
     
@@ -218,19 +255,13 @@ Return ONLY a JSON array of strings (no extra text):
         Returns:
             Path to the saved SRT file
         """
-        srt_content = []
-        
-        for i, segment in enumerate(segments, 1):
-            start_time = self._format_srt_time(segment['start_time'])
-            end_time = self._format_srt_time(segment['end_time'])
-            
-            srt_content.append(f"{i}")
-            srt_content.append(f"{start_time} --> {end_time}")
-            srt_content.append(segment['text'])
-            srt_content.append("")  # Blank line between subtitles
+        format_time = self._format_srt_time
         
+        # Write each subtitle as it's formatted, followed by a blank line
         with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(srt_content))
+            for i, segment in enumerate(segments, 1):
+                f.write(f"{i}\n{format_time(segment['start_time'])} --> "
+                        f"{format_time(segment['end_time'])}\n{segment['text']}\n\n")
         
         print(f"SRT file saved to {output_path}")
         return output_path
@@ -245,10 +276,10 @@ Return ONLY a JSON array of strings (no extra text):
         Returns:
             Formatted time string
         """
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds - int(seconds)) * 1000)
+        # Work in whole milliseconds so e.g. 2.3 doesn't come out as 2,299
+        total_secs, millis = divmod(int(round(seconds * 1000)), 1000)
+        minutes, secs = divmod(total_secs, 60)
+        hours, minutes = divmod(minutes, 60)
         
         return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
 
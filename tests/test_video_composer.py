@@ -0,0 +1,47 @@
+"""
+Tests for the subtitle blit in video_composer
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip('moviepy')
+
+from moviepy import ColorClip, ImageClip
+from video_composer import VideoComposer, _clip_overlay, _render_subtitle_bitmap
+
+
+def test_clip_overlay_trims_past_bottom_edge():
+    """An overlay reaching past the frame keeps only its visible rows"""
+    pm = np.zeros((500, 300, 3), np.uint16)
+    inv = np.full((500, 300, 1), 255, np.uint16)
+    y, x, h, w, pm_visible, inv_visible = _clip_overlay(700, 10, pm, inv, 1920, 1080)
+    assert (y, x, h, w) == (700, 10, 380, 300)
+    assert pm_visible.shape[:2] == inv_visible.shape[:2] == (380, 300)
+
+
+def test_clip_overlay_off_screen():
+    """An overlay entirely outside the frame is dropped"""
+    pm = np.zeros((50, 50, 3), np.uint16)
+    inv = np.full((50, 50, 1), 255, np.uint16)
+    assert _clip_overlay(1080, 0, pm, inv, 1920, 1080) is None
+    assert _clip_overlay(0, -50, pm, inv, 1920, 1080) is None
+
+
+def test_blit_tall_multiline_subtitle():
+    """A multi-line subtitle taller than the space below it is clipped, not an error"""
+    width, height = 1920, 1080
+    text = '\n'.join(f"Subtitle line {i}" for i in range(12))
+    bitmap = _render_subtitle_bitmap(text, 48, int(width * 0.9))
+    assert 700 + bitmap.shape[0] > height
+
+    subtitle = (ImageClip(bitmap, transparent=True)
+                .with_duration(1).with_start(0).with_position(('center', 700)))
+    video = ColorClip((width, height), color=(0, 0, 255), duration=1)
+
+    composer = VideoComposer()
+    frame = composer._blit_subtitles(video, [subtitle], width, height).get_frame(0.5)
+
+    assert frame.shape == (height, width, 3)
+    # Text was drawn below y=700 and nothing above it changed
+    assert (frame[700:] != (0, 0, 255)).any()
+    assert (frame[:700] == (0, 0, 255)).all()
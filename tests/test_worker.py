@@ -0,0 +1,67 @@
+"""
+Tests for VideoWorker shutdown and job recording
+"""
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from job_queue import JobStatus
+from worker import VideoWorker
+
+
+class FakeQueue:
+    """Records job updates instead of writing them to SQLite"""
+
+    def __init__(self):
+        self.updates = {}
+
+    def update_job(self, job_id, updates):
+        self.updates[job_id] = updates
+
+
+def _future(result=None, exception=None) -> Future:
+    future = Future()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+    return future
+
+
+def _worker(jobs: dict) -> VideoWorker:
+    worker = VideoWorker.__new__(VideoWorker)
+    worker.queue = FakeQueue()
+    worker.executor = None
+    worker.active_jobs = jobs
+    return worker
+
+
+def test_shutdown_requeues_interrupted_jobs():
+    """Jobs interrupted by Ctrl+C or a dead pool process go back to the queue"""
+    worker = _worker({
+        _future(exception=KeyboardInterrupt()): 'interrupted',
+        _future(exception=BrokenProcessPool('pool died')): 'broken',
+        _future(result={'path': 'video.mp4'}): 'completed',
+        _future(exception=RuntimeError('bad script')): 'failed',
+    })
+
+    worker._shutdown()
+
+    statuses = {job_id: update['status'] for job_id, update in worker.queue.updates.items()}
+    assert statuses == {
+        'interrupted': JobStatus.QUEUED,
+        'broken': JobStatus.QUEUED,
+        'completed': JobStatus.COMPLETED,
+        'failed': JobStatus.FAILED,
+    }
+    assert worker.active_jobs == {}
+
+
+def test_finish_job_requeues_keyboard_interrupt():
+    """A KeyboardInterrupt from the pool process doesn't escape finish_job"""
+    future = _future(exception=KeyboardInterrupt())
+    worker = _worker({future: 'job'})
+
+    worker.finish_job(future)
+
+    assert worker.queue.updates['job']['status'] == JobStatus.QUEUED
+    assert worker.active_jobs == {}
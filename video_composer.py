@@ -3,16 +3,269 @@ Video Composer Module
 Combines images and narration into a video with effects
 """
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+import os
 import random
-from moviepy import ImageClip, AudioFileClip, concatenate_videoclips, CompositeVideoClip, TextClip
+import subprocess
+import threading
+from bisect import bisect_right
+from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
+from moviepy.config import FFMPEG_BINARY
 import numpy as np
-from PIL import Image, ImageFont, ImageDraw
+from PIL import Image, ImageFont, ImageDraw, ImageColor
 import config
 import textwrap
 import math
 from subtitle_generator import SubtitleGenerator
 
+# Cores available to each video when the worker renders PIPELINE_POOL_SIZE at once
+CPU_SHARE = max(1, (os.cpu_count() or 1) // max(1, config.PIPELINE_POOL_SIZE))
+
+# OpenCV resizes NumPy frames in place of a round trip through PIL
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# config.EFFECT_INTERPOLATION -> OpenCV / PIL resampling filter for effect frames
+if CV2_AVAILABLE:
+    # cv2.resize already splits each frame across OpenCV's own native thread
+    # pool, outside the GIL; size it so the worker's parallel pipelines
+    # share the cores instead of each one claiming all of them
+    cv2.setNumThreads(CPU_SHARE)
+    CV2_INTERPOLATION = {
+        'nearest': cv2.INTER_NEAREST,
+        'linear': cv2.INTER_LINEAR,
+        'area': cv2.INTER_AREA,
+        'cubic': cv2.INTER_CUBIC,
+        'lanczos': cv2.INTER_LANCZOS4
+    }.get(config.EFFECT_INTERPOLATION, cv2.INTER_LINEAR)
+PIL_RESAMPLING = {
+    'nearest': Image.Resampling.NEAREST,
+    'linear': Image.Resampling.BILINEAR,
+    'area': Image.Resampling.BOX,
+    'cubic': Image.Resampling.BICUBIC,
+    'lanczos': Image.Resampling.LANCZOS
+}.get(config.EFFECT_INTERPOLATION, Image.Resampling.BILINEAR)
+
+# ffmpeg renderer: subtitle styles are scaled to libass's default 288-line canvas for SRT
+ASS_PLAY_RES_Y = 288
+
+# Hardware H.264 encoders to try before libx264, in order of preference
+HW_ENCODERS = ('h264_nvenc', 'h264_videotoolbox', 'h264_qsv')
+
+# Hardware encoder -> (preset, extra ffmpeg options), aiming at libx264 crf 23 quality
+HW_ENCODER_OPTIONS = {
+    'h264_nvenc': ('p4', ['-tune', 'hq', '-rc', 'vbr', '-cq', '23', '-b:v', '6M']),
+    'h264_qsv': ('medium', ['-global_quality', '23']),
+    'h264_videotoolbox': ('medium', ['-b:v', '6M'])
+}
+
+
+@lru_cache(maxsize=None)
+def _hardware_encoder() -> Optional[str]:
+    """
+    Find a hardware H.264 encoder in MoviePy's ffmpeg build, once per process
+    
+    Returns:
+        Encoder name, or None to encode with libx264
+    """
+    try:
+        result = subprocess.run(
+            [FFMPEG_BINARY, '-hide_banner', '-encoders'],
+            capture_output=True, text=True, timeout=30
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return next((encoder for encoder in HW_ENCODERS if f" {encoder} " in result.stdout), None)
+
+
+def _select_encoder() -> Optional[str]:
+    """
+    Hardware encoder to use, from config.VIDEO_CODEC
+    
+    Returns:
+        Encoder name, or None to encode with libx264
+    """
+    if config.VIDEO_CODEC == 'auto':
+        return _hardware_encoder()
+    if config.VIDEO_CODEC == 'libx264':
+        return None
+    return config.VIDEO_CODEC
+
+
+def _resize_frame(frame: np.ndarray, width: int, height: int,
+                  out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Resize an RGB frame array to width x height
+    
+    Args:
+        frame: Frame array (height, width, 3)
+        width: Target width
+        height: Target height
+        out: Optional (height, width, 3) uint8 buffer to write into with OpenCV
+        
+    Returns:
+        Resized frame array
+    """
+    if CV2_AVAILABLE:
+        # Crops are row-strided views, which OpenCV reads directly; only
+        # frames with padded pixels (e.g. RGB sliced from RGBA) need a copy
+        if frame.strides[1] != frame.shape[2] * frame.itemsize:
+            frame = np.ascontiguousarray(frame)
+        return cv2.resize(frame, (width, height), dst=out, interpolation=CV2_INTERPOLATION)
+    img = Image.fromarray(frame)
+    return np.asarray(img.resize((width, height), PIL_RESAMPLING))
+
+
+def _ease_expr(frame_count: int) -> str:
+    """
+    ffmpeg expression for the quartic ease-in-out used by the effects, over
+    zoompan's output frame number
+    
+    Args:
+        frame_count: Frames in the clip
+        
+    Returns:
+        Expression evaluating from 0 to 1
+    """
+    progress = f"(on/{frame_count})"
+    return f"if(lt({progress},0.5),8*pow({progress},4),1-pow(2-2*{progress},4)/2)"
+
+
+def _ass_colour(color: str) -> str:
+    """Convert a color name or #hex to an ASS &HAABBGGRR colour"""
+    red, green, blue = ImageColor.getrgb(color)[:3]
+    return f"&H00{blue:02X}{green:02X}{red:02X}"
+
+
+@lru_cache(maxsize=32)
+def _cover_size(img_width: int, img_height: int, width: int, height: int) -> tuple:
+    """
+    Size to resize an image to so it covers width x height, aspect ratio kept
+    
+    Generated images of one video (and usually across videos) share a size,
+    so this is computed once per distinct source and target size.
+    
+    Args:
+        img_width: Source image width
+        img_height: Source image height
+        width: Video width
+        height: Video height
+        
+    Returns:
+        (new_width, new_height)
+    """
+    # Calculate resize to maintain aspect ratio
+    aspect_ratio = img_width / img_height
+    target_aspect = width / height
+    
+    if aspect_ratio > target_aspect:
+        # Image is wider than target
+        return int(height * aspect_ratio), height
+    # Image is taller than target
+    return width, int(width / aspect_ratio)
+
+
+def _zoom_crop_boxes(zooms: np.ndarray, height: int, width: int) -> list:
+    """
+    Centre crop box for each zoom factor
+    
+    Args:
+        zooms: Zoom factor per frame
+        height: Frame height
+        width: Frame width
+        
+    Returns:
+        List of (y1, y2, x1, x2) per frame
+    """
+    new_h = (height / zooms).astype(np.int32)
+    new_w = (width / zooms).astype(np.int32)
+    y1 = (height - new_h) // 2
+    x1 = (width - new_w) // 2
+    return np.column_stack((y1, y1 + new_h, x1, x1 + new_w)).tolist()
+
+
+def _clip_overlay(y: int, x: int, text_premultiplied: np.ndarray, inverse_alpha: np.ndarray,
+                  width: int, height: int) -> Optional[tuple]:
+    """
+    Trim a subtitle overlay to the part that lies inside the frame
+    
+    Args:
+        y: Overlay top edge in the frame
+        x: Overlay left edge in the frame
+        text_premultiplied: Premultiplied text pixels (h, w, 3)
+        inverse_alpha: 255 - alpha (h, w, 1)
+        width: Frame width
+        height: Frame height
+        
+    Returns:
+        (y, x, h, w, text_premultiplied, inverse_alpha) for the visible part,
+        or None if none of the overlay is on screen
+    """
+    h, w = inverse_alpha.shape[:2]
+    top, left = max(0, -y), max(0, -x)
+    bottom, right = min(h, height - y), min(w, width - x)
+    if bottom <= top or right <= left:
+        return None
+    return (y + top, x + left, bottom - top, right - left,
+            text_premultiplied[top:bottom, left:right], inverse_alpha[top:bottom, left:right])
+
+
+@lru_cache(maxsize=16)
+def _subtitle_font(font_size: int):
+    """
+    Load config.SUBTITLE_FONT at a size, once per process
+    
+    Args:
+        font_size: Font size in pixels
+        
+    Returns:
+        Pillow font, with its parsed face and glyph cache kept between subtitles
+    """
+    try:
+        return ImageFont.truetype(config.SUBTITLE_FONT, font_size)
+    except OSError:
+        # Font not installed under that name; use Pillow's built-in font
+        return ImageFont.load_default(font_size)
+
+
+@lru_cache(maxsize=512)
+def _render_subtitle_bitmap(text: str, font_size: int, width: int) -> np.ndarray:
+    """
+    Rasterize subtitle text with Pillow, reusing the bitmap when the same
+    text is shown again at the same size
+    
+    Args:
+        text: Wrapped subtitle text
+        font_size: Font size in pixels
+        width: Text box width
+        
+    Returns:
+        Read-only RGBA array, width wide, with the text centred
+    """
+    font = _subtitle_font(font_size)
+    stroke_width = config.SUBTITLE_STROKE_WIDTH
+    
+    measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+    left, top, right, bottom = measure.multiline_textbbox(
+        (0, 0), text, font=font, stroke_width=stroke_width, align='center'
+    )
+    img = Image.new('RGBA', (width, bottom - top), (0, 0, 0, 0))
+    ImageDraw.Draw(img).multiline_text(
+        ((width - (right - left)) / 2 - left, -top), text, font=font,
+        fill=config.SUBTITLE_COLOR, stroke_width=stroke_width,
+        stroke_fill=config.SUBTITLE_STROKE_COLOR, align='center'
+    )
+    
+    # Shared between calls, so it must not be modified
+    bitmap = np.asarray(img)
+    bitmap.setflags(write=False)
+    return bitmap
+
 
 class VideoComposer:
     """Compose final video from images and audio"""
@@ -20,142 +273,164 @@ class VideoComposer:
     def __init__(self):
         """Initialize the video composer"""
         self.fps = config.DEFAULT_FPS
-        self.subtitle_gen = SubtitleGenerator()
+        self.hw_encoder = _select_encoder()
+        self._scratch = threading.local()
     
-    def _make_zoom_in_effect(self, duration):
-        """Create smooth zoom in effect function with enhanced easing"""
-        def effect(get_frame, t):
-            frame = get_frame(t)
-            h, w = frame.shape[:2]
+    def _scratch_frame(self, height: int, width: int) -> np.ndarray:
+        """
+        Output buffer the effects render into, reused for every frame
+        
+        MoviePy encodes each frame before asking for the next, so one buffer
+        per rendering thread is enough.
+        
+        Args:
+            height: Frame height
+            width: Frame width
             
-            # Calculate zoom factor with smooth easing (1.0 to 1.35) - more dynamic
-            progress = t / duration
-            # Apply quartic ease-in-out for ultra smooth cinematic motion
-            if progress < 0.5:
-                eased_progress = 8 * progress * progress * progress * progress
-            else:
-                eased_progress = 1 - pow(-2 * progress + 2, 4) / 2
-            zoom = 1.0 + (eased_progress * 0.35)  # Increased to 35% for more impact
-            
-            # Calculate crop coordinates for zoom
-            new_h, new_w = int(h / zoom), int(w / zoom)
-            y1, x1 = (h - new_h) // 2, (w - new_w) // 2
-            y2, x2 = y1 + new_h, x1 + new_w
-            
-            # Crop and resize back with high quality
-            cropped = frame[y1:y2, x1:x2]
-            img = Image.fromarray(cropped)
-            img_resized = img.resize((w, h), Image.Resampling.LANCZOS)
-            return np.array(img_resized)
-        return effect
+        Returns:
+            (height, width, 3) uint8 array, overwritten by the next frame
+        """
+        frame = getattr(self._scratch, 'frame', None)
+        if frame is None or frame.shape[:2] != (height, width):
+            frame = self._scratch.frame = np.empty((height, width, 3), np.uint8)
+        return frame
     
-    def _make_zoom_out_effect(self, duration):
-        """Create smooth zoom out effect function with enhanced easing"""
+    @cached_property
+    def subtitle_gen(self) -> SubtitleGenerator:
+        """Subtitle generator, built on first use so subtitle-free runs skip its API client"""
+        return SubtitleGenerator()
+    
+    def _eased_progress(self, duration) -> np.ndarray:
+        """
+        Clip progress with quartic ease-in-out for every frame of a clip
+        
+        The effects look their per-frame values up in tables built from this
+        instead of evaluating the easing on every rendered frame.
+        
+        Args:
+            duration: Clip duration
+            
+        Returns:
+            Eased progress (0 to 1) indexed by frame number (t * fps)
+        """
+        frame_count = int(duration * self.fps) + 2
+        progress = np.arange(frame_count) / self.fps / duration
+        # Apply quartic ease-in-out for ultra smooth cinematic motion
+        return np.where(progress < 0.5,
+                        8 * progress ** 4,
+                        1 - (-2 * progress + 2) ** 4 / 2)
+    
+    def _zoom_factors(self, duration, start_zoom, end_zoom) -> np.ndarray:
+        """
+        Zoom factor for every frame of a clip, with quartic ease-in-out
+        
+        Args:
+            duration: Clip duration
+            start_zoom: Zoom factor at the first frame
+            end_zoom: Zoom factor at the end of the clip
+            
+        Returns:
+            Array indexed by frame number (t * fps)
+        """
+        return start_zoom + self._eased_progress(duration) * (end_zoom - start_zoom)
+    
+    def _make_crop_zoom_effect(self, zooms: np.ndarray, h: int, w: int):
+        """Create an effect that crops each h x w frame by its precomputed zoom factor"""
+        fps = self.fps
+        last = len(zooms) - 1
+        # Crop boxes depend only on the frame size, fixed for the clip
+        boxes = _zoom_crop_boxes(zooms, h, w)
+        
         def effect(get_frame, t):
-            frame = get_frame(t)
-            h, w = frame.shape[:2]
+            y1, y2, x1, x2 = boxes[min(int(t * fps + 0.5), last)]
             
-            # Calculate zoom factor (1.35 to 1.0) with smooth easing - more dynamic
-            progress = t / duration
-            # Apply quartic ease-in-out for ultra smooth cinematic motion
-            if progress < 0.5:
-                eased_progress = 8 * progress * progress * progress * progress
-            else:
-                eased_progress = 1 - pow(-2 * progress + 2, 4) / 2
-            zoom = 1.35 - (eased_progress * 0.35)  # Increased to 35% for more impact
-            
-            # Calculate crop coordinates for zoom
-            new_h, new_w = int(h / zoom), int(w / zoom)
-            y1, x1 = (h - new_h) // 2, (w - new_w) // 2
-            y2, x2 = y1 + new_h, x1 + new_w
-            
-            # Crop and resize back with high quality
-            cropped = frame[y1:y2, x1:x2]
-            img = Image.fromarray(cropped)
-            img_resized = img.resize((w, h), Image.Resampling.LANCZOS)
-            return np.array(img_resized)
+            # Crop and resize back to the frame size
+            return _resize_frame(get_frame(t)[y1:y2, x1:x2], w, h, self._scratch_frame(h, w))
         return effect
     
-    def _make_pan_effect(self, duration):
+    def _make_zoom_in_effect(self, duration, h: int, w: int):
+        """Create smooth zoom in effect function with enhanced easing"""
+        # Zoom from 1.0 to 1.35 - increased to 35% for more impact
+        return self._make_crop_zoom_effect(self._zoom_factors(duration, 1.0, 1.35), h, w)
+    
+    def _make_zoom_out_effect(self, duration, h: int, w: int):
+        """Create smooth zoom out effect function with enhanced easing"""
+        # Zoom from 1.35 to 1.0 - increased to 35% for more impact
+        return self._make_crop_zoom_effect(self._zoom_factors(duration, 1.35, 1.0), h, w)
+    
+    def _make_pan_effect(self, duration, h: int, w: int):
         """Create smooth diagonal pan effect function with enhanced motion"""
+        # Diagonal pan with quartic easing - ultra smooth cinematic motion
+        eased_progress = self._eased_progress(duration)
+        fps = self.fps
+        last = len(eased_progress) - 1
+        v_shifts = (h * 0.08 * (eased_progress - 0.5)).astype(np.int32)  # Vertical shift for diagonal effect (8%)
+        h_shifts = (w * 0.18 * (eased_progress - 0.5)).astype(np.int32)  # Horizontal shift (increased to 18%)
+        pad_v, pad_h = int(np.abs(v_shifts).max()), int(np.abs(h_shifts).max())
+        # Window origin in the padded image for each frame
+        shifts = np.column_stack((pad_v - v_shifts, pad_h - h_shifts)).tolist()
+        padded = None
+        
         def effect(get_frame, t):
-            frame = get_frame(t)
-            h, w = frame.shape[:2]
-            
-            # Diagonal pan with quartic easing - ultra smooth cinematic motion
-            progress = t / duration
-            # Apply quartic ease-in-out
-            if progress < 0.5:
-                eased_progress = 8 * progress * progress * progress * progress
-            else:
-                eased_progress = 1 - pow(-2 * progress + 2, 4) / 2
-            
-            # Horizontal shift (increased to 18%)
-            h_shift = int(w * 0.18 * (eased_progress - 0.5))
-            # Vertical shift for diagonal effect (8%)
-            v_shift = int(h * 0.08 * (eased_progress - 0.5))
-            
-            # Apply horizontal pan
-            if h_shift > 0:
-                frame = np.pad(frame, ((0, 0), (h_shift, 0), (0, 0)), mode='edge')[:, :w]
-            elif h_shift < 0:
-                frame = np.pad(frame, ((0, 0), (0, -h_shift), (0, 0)), mode='edge')[:, -w:]
-            
-            # Apply vertical pan
-            if v_shift > 0:
-                frame = np.pad(frame, ((v_shift, 0), (0, 0), (0, 0)), mode='edge')[:h, :]
-            elif v_shift < 0:
-                frame = np.pad(frame, ((0, -v_shift), (0, 0), (0, 0)), mode='edge')[-h:, :]
-            
-            return frame
+            nonlocal padded
+            # The source is a still image: edge-pad it once by the largest
+            # shift, then every frame is a window into the padded image
+            if padded is None:
+                padded = np.pad(get_frame(t), ((pad_v, pad_v), (pad_h, pad_h), (0, 0)), mode='edge')
+            top, left = shifts[min(int(t * fps + 0.5), last)]
+            
+            return padded[top:top + h, left:left + w]
         return effect
     
-    def _make_rotate_zoom_effect(self, duration):
+    def _make_rotate_zoom_effect(self, duration, h: int, w: int):
         """Create smooth rotate + zoom effect for cinematic feel"""
+        # Progress with quartic easing
+        eased = self._eased_progress(duration)
+        # Subtle rotation (-2° to +2°) + zoom (1.0 to 1.25)
+        radians = np.radians((eased - 0.5) * 4)  # -2 to +2 degrees
+        zooms = 1.0 + (eased * 0.25)
+        fps = self.fps
+        last = len(eased) - 1
+        
+        if CV2_AVAILABLE:
+            # Zoom, rotation and centre crop folded into one affine warp per
+            # frame, as cv2.getRotationMatrix2D about the frame centre would
+            # build it: a single pass with no oversized intermediate image
+            cx, cy = (w - 1) / 2, (h - 1) / 2
+            alpha, beta = zooms * np.cos(radians), zooms * np.sin(radians)
+            matrices = np.stack((
+                np.column_stack((alpha, beta, (1 - alpha) * cx - beta * cy)),
+                np.column_stack((-beta, alpha, beta * cx + (1 - alpha) * cy))
+            ), axis=1)
+            
+            def effect(get_frame, t):
+                matrix = matrices[min(int(t * fps + 0.5), last)]
+                return cv2.warpAffine(get_frame(t), matrix, (w, h), dst=self._scratch_frame(h, w),
+                                      flags=CV2_INTERPOLATION,
+                                      borderMode=cv2.BORDER_CONSTANT, borderValue=(0, 0, 0))
+            return effect
+        
+        # PIL fallback: the same warp as one uint8 affine transform, mapping
+        # each output pixel back into the source frame
+        cx, cy = w / 2, h / 2
+        cos, sin = np.cos(radians) / zooms, np.sin(radians) / zooms
+        transforms = np.column_stack((
+            cos, -sin, cx - cos * cx + sin * cy, sin, cos, cy - sin * cx - cos * cy
+        )).tolist()
+        
         def effect(get_frame, t):
-            frame = get_frame(t)
-            h, w = frame.shape[:2]
-            
-            # Progress with quartic easing
-            progress = t / duration
-            if progress < 0.5:
-                eased = 8 * progress * progress * progress * progress
-            else:
-                eased = 1 - pow(-2 * progress + 2, 4) / 2
-            
-            # Subtle rotation (-2° to +2°) + zoom (1.0 to 1.25)
-            angle = (eased - 0.5) * 4  # -2 to +2 degrees
-            zoom = 1.0 + (eased * 0.25)
-            
-            # Use PIL for rotation and zoom
-            img = Image.fromarray(frame)
-            
-            # Calculate new dimensions after zoom
-            new_w, new_h = int(w * zoom), int(h * zoom)
-            
-            # Zoom first
-            img_zoomed = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            
-            # Rotate with expand to prevent cropping
-            img_rotated = img_zoomed.rotate(angle, resample=Image.Resampling.BICUBIC, expand=False, fillcolor=(0, 0, 0))
-            
-            # Crop back to original size (center crop)
-            left = (img_rotated.width - w) // 2
-            top = (img_rotated.height - h) // 2
-            img_cropped = img_rotated.crop((left, top, left + w, top + h))
+            img = Image.fromarray(get_frame(t)).transform(
+                (w, h), Image.Transform.AFFINE, transforms[min(int(t * fps + 0.5), last)],
+                resample=PIL_RESAMPLING, fillcolor=(0, 0, 0)
+            )
             
-            return np.array(img_cropped)
+            return np.asarray(img)
         return effect
     
-    def __init__(self):
-        """Initialize the video composer"""
-        self.fps = config.DEFAULT_FPS
-        self.subtitle_gen = SubtitleGenerator()
-    
     def create_video(self, image_paths: List[Path], audio_path: Path,
                      video_format: str = '16:9', 
                      video_title: str = 'output',
-                     script: str = '') -> Path:
+                     script: str = '', run_id: str = '') -> Path:
         """
         Create video from images and audio with subtitles
         
@@ -165,12 +440,15 @@ class VideoComposer:
             video_format: Video aspect ratio (9:16, 16:9, 1:1)
             video_title: Title for output video file
             script: Script text for subtitles
+            run_id: Optional identifier added to temporary file names so
+                concurrent runs don't overwrite each other's files
             
         Returns:
             Path to the generated video
         """
         try:
             print(f"Creating video with {len(image_paths)} images...")
+            tag = f"{run_id}_" if run_id else ""
             
             # Load audio
             audio = AudioFileClip(str(audio_path))
@@ -182,37 +460,34 @@ class VideoComposer:
             # Get video dimensions
             width, height = config.VIDEO_FORMATS[video_format]
             
+            # Generate output path
+            from slugify import slugify
+            safe_title = slugify(video_title)
+            output_path = config.VIDEOS_DIR / f"{safe_title}.mp4"
+            
+            if config.RENDER_BACKEND == 'ffmpeg':
+                try:
+                    self._render_with_ffmpeg(image_paths, audio_path, width, height, total_duration,
+                                             script, output_path, tag)
+                    audio.close()
+                    print(f"Video created successfully: {output_path}")
+                    return output_path
+                except (OSError, subprocess.SubprocessError) as e:
+                    print(f"ffmpeg render failed: {e}, falling back to MoviePy...")
+            
+            # Load and resize the images in parallel; PIL releases the GIL
+            # while decoding and resampling
+            print(f"Processing {len(image_paths)} images...")
+            with ThreadPoolExecutor(max_workers=min(len(image_paths), CPU_SHARE)) as executor:
+                frames = list(executor.map(
+                    lambda img_path: self._prepare_image(img_path, width, height), image_paths
+                ))
+            
             # Create video clips with effects
             clips = []
-            for i, img_path in enumerate(image_paths):
-                print(f"Processing image {i+1}/{len(image_paths)}...")
-                
-                # Load and resize image using PIL
-                img = Image.open(str(img_path))
-                img_width, img_height = img.size
-                
-                # Calculate resize to maintain aspect ratio
-                aspect_ratio = img_width / img_height
-                target_aspect = width / height
-                
-                if aspect_ratio > target_aspect:
-                    # Image is wider than target
-                    new_height = height
-                    new_width = int(height * aspect_ratio)
-                else:
-                    # Image is taller than target
-                    new_width = width
-                    new_height = int(width / aspect_ratio)
-                
-                img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                
-                # Save resized image temporarily
-                temp_img_path = config.TEMP_DIR / f"temp_resized_{i}.png"
-                img_resized.save(temp_img_path)
-                img.close()
-                
-                # Create image clip from resized image
-                clip = ImageClip(str(temp_img_path), duration=duration_per_image)
+            for frame in frames:
+                # Create image clip straight from the resized pixels
+                clip = ImageClip(frame, duration=duration_per_image)
                 
                 # Apply zoom and pan effect
                 clip = self._apply_zoom_pan_effect(clip, width, height, duration_per_image)
@@ -221,12 +496,17 @@ class VideoComposer:
             
             # Concatenate all clips with smooth transitions
             print("Combining clips...")
-            final_video = concatenate_videoclips(clips, method="compose")
+            # Clips cropped to the output size are simply played back to back;
+            # "compose" (an alpha-composited canvas) is only needed if one
+            # fell through uncropped
+            same_size = all(clip.size == (width, height) for clip in clips)
+            final_video = concatenate_videoclips(clips, method="chain" if same_size else "compose")
             
             # Add AI-powered subtitles
             if script and config.ENABLE_SUBTITLES:
                 print("Generating AI-powered subtitles...")
-                final_video = self._add_ai_subtitles(final_video, script, width, height, total_duration, len(image_paths))
+                final_video = self._add_ai_subtitles(final_video, script, width, height, total_duration,
+                                                     len(image_paths), run_id)
             
             # Set audio - use with_audio instead of set_audio for MoviePy 2.x
             try:
@@ -241,23 +521,9 @@ class VideoComposer:
             except AttributeError:
                 final_video = final_video.set_duration(total_duration)
             
-            # Generate output path
-            from slugify import slugify
-            safe_title = slugify(video_title)
-            output_path = config.VIDEOS_DIR / f"{safe_title}.mp4"
-            
             # Write video file
             print(f"Rendering final video to {output_path}...")
-            final_video.write_videofile(
-                str(output_path),
-                fps=self.fps,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile=str(config.TEMP_DIR / 'temp_audio.m4a'),
-                remove_temp=True,
-                threads=4,
-                preset='medium'
-            )
+            self._write_video(final_video, output_path, tag)
             
             # Clean up
             audio.close()
@@ -272,6 +538,175 @@ class VideoComposer:
             print(f"Error creating video: {e}")
             raise
     
+    def _render_with_ffmpeg(self, image_paths: List[Path], audio_path: Path, width: int,
+                            height: int, total_duration: float, script: str,
+                            output_path: Path, tag: str = ''):
+        """
+        Render the whole video in one ffmpeg process
+        
+        Scaling, zoom/pan (zoompan), concatenation, subtitles (libass) and
+        encoding all run inside ffmpeg's filter graph, with no per-frame
+        Python. The rotate effect has no zoompan equivalent, so images get
+        zoom in, zoom out or a diagonal pan.
+        
+        Args:
+            image_paths: List of image file paths
+            audio_path: Path to audio file
+            width: Video width
+            height: Video height
+            total_duration: Audio duration in seconds
+            script: Script text for subtitles
+            output_path: Path of the MP4 to write
+            tag: Prefix for the temporary subtitle file name
+            
+        Raises:
+            subprocess.CalledProcessError: If ffmpeg fails, e.g. when built without libass
+        """
+        count = len(image_paths)
+        duration_per_image = total_duration / count
+        frame_count = max(1, round(duration_per_image * self.fps))
+        ease = _ease_expr(frame_count)
+        centre = "x='iw/2-iw/zoom/2':y='ih/2-ih/zoom/2'"
+        effects = [
+            f"z='1+0.35*{ease}':{centre}",              # Zoom in
+            f"z='1.35-0.35*{ease}':{centre}",           # Zoom out
+            f"z='1.2':x='(iw-iw/zoom)*{ease}':y='(ih-ih/zoom)*{ease}'",  # Diagonal pan
+            f"z='1+0.35*{ease}':{centre}",              # Zoom in twice for higher probability
+        ]
+        
+        inputs, filters = [], []
+        for i, img_path in enumerate(image_paths):
+            inputs += ['-loop', '1', '-framerate', str(self.fps), '-t', f"{duration_per_image:.3f}",
+                       '-i', str(Path(img_path).resolve())]
+            filters.append(
+                f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=increase,"
+                f"crop={width}:{height},setsar=1,"
+                f"zoompan={random.choice(effects)}:d=1:s={width}x{height}:fps={self.fps}[v{i}]"
+            )
+        filters.append(''.join(f"[v{i}]" for i in range(count)) + f"concat=n={count}:v=1:a=0[video]")
+        output_label = '[video]'
+        
+        # Add AI-powered subtitles; the SRT is referenced by name relative to
+        # TEMP_DIR (ffmpeg's working directory) to avoid filter-graph path escaping
+        if script and config.ENABLE_SUBTITLES:
+            print("Generating AI-powered subtitles...")
+            segments = self.subtitle_gen.generate_subtitle_segments(script, total_duration, count)
+            if segments:
+                srt_name = f"{tag}subtitles.srt"
+                self.subtitle_gen.export_srt(segments, str(config.TEMP_DIR / srt_name))
+                scale = ASS_PLAY_RES_Y / height
+                style = ','.join([
+                    f"FontName={config.SUBTITLE_FONT}",
+                    f"FontSize={round(height * config.SUBTITLE_FONT_SIZE_RATIO * scale)}",
+                    f"PrimaryColour={_ass_colour(config.SUBTITLE_COLOR)}",
+                    f"OutlineColour={_ass_colour(config.SUBTITLE_STROKE_COLOR)}",
+                    f"Outline={config.SUBTITLE_STROKE_WIDTH * scale:.1f}",
+                    f"MarginV={round(height * config.SUBTITLE_BOTTOM_PADDING * scale)}",
+                    "BorderStyle=1",
+                    "Alignment=2"
+                ])
+                filters.append(f"[video]subtitles={srt_name}:force_style='{style}'[subtitled]")
+                output_label = '[subtitled]'
+        
+        command = [
+            FFMPEG_BINARY, '-y', '-hide_banner', '-loglevel', 'error',
+            *inputs,
+            '-i', str(Path(audio_path).resolve()),
+            '-filter_complex', ';'.join(filters),
+            '-map', output_label, '-map', f"{count}:a",
+            '-c:v', 'libx264', '-preset', 'faster', '-tune', 'stillimage', '-crf', '23',
+            '-pix_fmt', 'yuv420p', '-r', str(self.fps),
+            '-c:a', 'aac', '-movflags', '+faststart', '-threads', str(CPU_SHARE),
+            '-t', f"{total_duration:.3f}",
+            str(Path(output_path).resolve())
+        ]
+        print(f"Rendering final video to {output_path} with ffmpeg...")
+        try:
+            subprocess.run(command, cwd=config.TEMP_DIR, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            print(f"ffmpeg error: {e.stderr.strip()}")
+            raise
+    
+    def _write_video(self, video_clip, output_path: Path, tag: str = ''):
+        """
+        Encode the final video, on a hardware encoder when ffmpeg has one
+        
+        Args:
+            video_clip: The composed clip with audio
+            output_path: Path of the MP4 to write
+            tag: Prefix for the temporary audio file name
+        """
+        write_args = dict(
+            fps=self.fps,
+            audio_codec='aac',
+            temp_audiofile=str(config.TEMP_DIR / f'{tag}temp_audio.m4a'),
+            remove_temp=True,
+            # Encoder threads for this video's share of the cores, so
+            # parallel renders don't oversubscribe the machine
+            threads=CPU_SHARE
+        )
+        
+        # ffmpeg can list an encoder whose hardware or driver isn't present,
+        # so fall back to libx264 if it fails, and stop trying it
+        encoder = self.hw_encoder
+        if encoder:
+            preset, options = HW_ENCODER_OPTIONS.get(encoder, ('medium', []))
+            try:
+                video_clip.write_videofile(
+                    str(output_path),
+                    codec=encoder,
+                    preset=preset,
+                    # 4:2:0 like libx264; otherwise ffmpeg may pick 4:4:4 for RGB input
+                    ffmpeg_params=options + ['-pix_fmt', 'yuv420p', '-movflags', '+faststart'],
+                    **write_args
+                )
+                return
+            except Exception as e:
+                print(f"Hardware encoder {encoder} failed: {e}, using libx264...")
+                self.hw_encoder = None
+        
+        # Slow zooms and pans over still images: a faster preset and the
+        # stillimage tuning lose little quality on this content
+        video_clip.write_videofile(
+            str(output_path),
+            codec='libx264',
+            preset='faster',
+            ffmpeg_params=['-tune', 'stillimage', '-crf', '23', '-movflags', '+faststart'],
+            **write_args
+        )
+    
+    def _prepare_image(self, img_path: Path, width: int, height: int) -> np.ndarray:
+        """
+        Load an image, resize it to cover the video frame and centre crop it
+        
+        Args:
+            img_path: Image file path
+            width: Video width
+            height: Video height
+            
+        Returns:
+            Contiguous RGB pixel array of width x height, aspect ratio kept
+        """
+        # Load and resize image using PIL; for large downscales reducing_gap
+        # first shrinks by a whole factor with a cheap box filter, then
+        # applies LANCZOS to the remaining (at least 3x oversampled) image
+        # The with block closes the file even if decoding fails
+        with Image.open(str(img_path)) as img:
+            cover_width, cover_height = _cover_size(*img.size, width, height)
+            # Resample only the source region the centre crop keeps, the
+            # same pixels as resizing the whole image and cropping after
+            left = (cover_width // 2 - width // 2) * img.width / cover_width
+            top = (cover_height // 2 - height // 2) * img.height / cover_height
+            box = (left, top,
+                   left + width * img.width / cover_width, top + height * img.height / cover_height)
+            img_resized = img.resize((width, height), Image.Resampling.LANCZOS,
+                                     box=box, reducing_gap=3.0)
+        if img_resized.mode != 'RGB':
+            img_resized = img_resized.convert('RGB')
+        
+        # Packed RGB uint8 rows keep OpenCV and Pillow on their fast paths
+        return np.ascontiguousarray(np.asarray(img_resized, dtype=np.uint8))
+    
     def _apply_zoom_pan_effect(self, clip, target_width: int, 
                                target_height: int, duration: float):
         """
@@ -310,25 +745,28 @@ class VideoComposer:
             return frame[y1:y2, x1:x2]
         
         try:
-            # Apply crop
-            cropped = clip.image_transform(crop_frame)
-            
-            # Apply random animation effect for reels with varied intensity
-            effect_functions = [
-                self._make_zoom_in_effect(duration),
-                self._make_zoom_out_effect(duration),
-                self._make_pan_effect(duration),
-                self._make_rotate_zoom_effect(duration),
+            # Apply random animation effect for reels with varied intensity;
+            # only the chosen effect is built
+            effect_factories = [
+                self._make_zoom_in_effect,
+                self._make_zoom_out_effect,
+                self._make_pan_effect,
+                self._make_rotate_zoom_effect,
                 # Add zoom in twice for higher probability of zoom effects
-                self._make_zoom_in_effect(duration),
+                self._make_zoom_in_effect,
             ]
-            effect = random.choice(effect_functions)
+            # Effects are built for the crop's fixed size
+            effect = random.choice(effect_factories)(duration, y2 - y1, x2 - x1)
             
             # Apply slight speed variation (0.95x to 1.05x) for organic feel
             speed_factor = random.uniform(0.95, 1.05)
             
-            # Apply the effect using transform
-            animated_clip = cropped.transform(effect)
+            # Crop and animate in a single transform; the crop is a view of
+            # the source frame, so the effect reads the pixels only once
+            def animate(get_frame, t):
+                return effect(lambda frame_t: crop_frame(get_frame(frame_t)), t)
+            
+            animated_clip = clip.transform(animate)
             
             # Apply speed variation
             try:
@@ -341,16 +779,19 @@ class VideoComposer:
             
         except Exception as e:
             print(f"Animation effect failed: {e}, using static crop")
-            # Fallback: return cropped clip without animation
+            # Fallback: return cropped clip without animation, cropped once
+            # up front rather than on every rendered frame
             try:
-                cropped = clip.image_transform(crop_frame)
-                return cropped
+                return ImageClip(
+                    np.ascontiguousarray(crop_frame(clip.get_frame(0))), duration=clip.duration
+                ).with_fps(self.fps)
             except Exception as e2:
                 print(f"Crop also failed: {e2}, returning original clip")
                 return clip
     
     def _add_ai_subtitles(self, video_clip, script: str, width: int, 
-                          height: int, duration: float, num_images: int):
+                          height: int, duration: float, num_images: int,
+                          run_id: str = ''):
         """
         Add AI-generated subtitles to video with professional styling
         
@@ -361,6 +802,7 @@ class VideoComposer:
             height: Video height
             duration: Video duration
             num_images: Number of images/scenes
+            run_id: Optional identifier added to the SRT file name
             
         Returns:
             Video clip with subtitles
@@ -376,7 +818,8 @@ class VideoComposer:
                 return video_clip
             
             # Export SRT file for reference
-            srt_path = config.TEMP_DIR / "subtitles.srt"
+            tag = f"{run_id}_" if run_id else ""
+            srt_path = config.TEMP_DIR / f"{tag}subtitles.srt"
             self.subtitle_gen.export_srt(subtitle_segments, str(srt_path))
             
             # Create subtitle clips with professional styling
@@ -399,11 +842,10 @@ class VideoComposer:
                 if txt_clip:
                     subtitle_clips.append(txt_clip)
             
-            # Composite subtitles onto video
+            # Burn subtitles into the video frames
             if subtitle_clips:
                 print(f"Adding {len(subtitle_clips)} subtitle segments to video...")
-                video_with_subs = CompositeVideoClip([video_clip] + subtitle_clips)
-                return video_with_subs
+                return self._blit_subtitles(video_clip, subtitle_clips, width, height)
             else:
                 print("No subtitle clips were created successfully, proceeding without subtitles...")
                 return video_clip
@@ -414,6 +856,61 @@ class VideoComposer:
             traceback.print_exc()
             return video_clip
     
+    def _blit_subtitles(self, video_clip, subtitle_clips: list, width: int, height: int):
+        """
+        Alpha-blend subtitles into the video's frames
+        
+        Each subtitle is rasterized once; every frame then blends at most the
+        one subtitle showing at that time, over just the text's rectangle,
+        instead of compositing every subtitle layer onto the whole frame.
+        
+        Args:
+            video_clip: The video clip to add subtitles to
+            subtitle_clips: Positioned subtitle clips from _create_styled_subtitle,
+                in start-time order and not overlapping
+            width: Video width
+            height: Video height
+            
+        Returns:
+            Video clip with subtitles
+        """
+        starts, ends, overlays = [], [], []
+        for txt_clip in subtitle_clips:
+            text_rgb = txt_clip.get_frame(0)
+            if txt_clip.mask is not None:
+                alpha = np.rint(txt_clip.mask.get_frame(0) * 255).astype(np.uint16)[..., None]
+            else:
+                alpha = np.full(text_rgb.shape[:2] + (1,), 255, np.uint16)
+            h, w = text_rgb.shape[:2]
+            x, y = txt_clip.pos(0)
+            if x == 'center':
+                x = (width - w) // 2
+            
+            # Premultiplied text and inverse alpha, in 0-255 fixed point,
+            # cut down to the part inside the frame (a tall subtitle can
+            # reach past the bottom edge)
+            overlay = _clip_overlay(int(y), int(x), text_rgb * alpha, 255 - alpha, width, height)
+            if overlay is None:
+                continue
+            starts.append(txt_clip.start)
+            ends.append(txt_clip.end)
+            overlays.append(overlay)
+        
+        def blit(get_frame, t):
+            frame = get_frame(t)
+            i = bisect_right(starts, t) - 1
+            if i < 0 or t >= ends[i]:
+                return frame
+            
+            y, x, h, w, text_premultiplied, inverse_alpha = overlays[i]
+            # Upstream frames may be shared buffers (e.g. a static image clip)
+            frame = frame.copy()
+            region = frame[y:y + h, x:x + w]
+            region[...] = (region * inverse_alpha + text_premultiplied + 127) // 255
+            return frame
+        
+        return video_clip.transform(blit)
+    
     def _create_styled_subtitle(self, text: str, video_width: int, 
                                 video_height: int, duration: float, 
                                 start_time: float):
@@ -428,7 +925,7 @@ class VideoComposer:
             start_time: When subtitle appears
             
         Returns:
-            Styled TextClip or None
+            Styled subtitle ImageClip or None
         """
         try:
             # Calculate font size based on video height
@@ -438,35 +935,9 @@ class VideoComposer:
             max_chars_per_line = int(video_width * 0.8 / (font_size * 0.6))
             wrapped_text = textwrap.fill(text, width=max_chars_per_line)
             
-            # Try creating text clip with label method (more compatible)
-            try:
-                txt_clip = TextClip(
-                    text=wrapped_text,
-                    font_size=font_size,
-                    color=config.SUBTITLE_COLOR,
-                    stroke_color=config.SUBTITLE_STROKE_COLOR,
-                    stroke_width=config.SUBTITLE_STROKE_WIDTH,
-                    method='label',
-                    size=(int(video_width * 0.9), None)
-                )
-            except Exception as e1:
-                print(f"Label method failed: {e1}, trying caption method...")
-                # Fallback to caption without font specification
-                try:
-                    txt_clip = TextClip(
-                        text=wrapped_text,
-                        font_size=font_size,
-                        color=config.SUBTITLE_COLOR,
-                        method='caption',
-                        size=(int(video_width * 0.9), None),
-                        text_align='center'
-                    )
-                except Exception as e2:
-                    print(f"Caption method failed: {e2}")
-                    return None
-            
-            if txt_clip is None:
-                return None
+            # Pillow draws the text in-process; the clip's mask comes from the alpha channel
+            bitmap = _render_subtitle_bitmap(wrapped_text, font_size, int(video_width * 0.9))
+            txt_clip = ImageClip(bitmap, transparent=True)
             
             # Set duration and start time
             txt_clip = txt_clip.with_duration(duration).with_start(start_time)
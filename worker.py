@@ -2,63 +2,125 @@
 Background Worker for Video Generation
 Processes jobs from the queue in the background
 """
-import time
+import logging
+import signal
 import sys
+import threading
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from job_queue import JobQueue, JobStatus
-from pipeline import VideoGeneratorPipeline
+from pipeline import get_pipeline
+import config
 import traceback
+from logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+# Queue connection owned by each pool process, built once by _init_pipeline
+_queue = None
+
+
+def _init_pipeline():
+    """Pool initializer - build the pipeline and queue connection once per worker process"""
+    global _queue
+    # Forked processes inherit the parent's SIGTERM handler; restore the default
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Ctrl+C reaches the whole process group; only the parent handles it,
+    # then stops the pool and re-queues unfinished jobs
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+    get_pipeline()
+    _queue = JobQueue()
+
+
+def _run_pipeline(job_id: str, video_data: dict) -> dict:
+    """
+    Generate a video inside a pool process
+    
+    Defined at module level so it can be pickled by ProcessPoolExecutor.
+    
+    Args:
+        job_id: Job identifier, used for progress updates
+        video_data: Video generation parameters
+        
+    Returns:
+        Video metadata returned by the pipeline
+    """
+    last_reported = None
+    
+    def report_progress(progress: int, message: str):
+        # Each report is one UPDATE; skip it when nothing would change
+        nonlocal last_reported
+        if (progress, message) == last_reported:
+            return
+        last_reported = (progress, message)
+        _queue.update_job(job_id, {
+            'progress': progress,
+            'message': message
+        })
+        
+    return get_pipeline().generate_video(video_data, report_progress)
 
 
 class VideoWorker:
     """
     Background worker that processes video generation jobs
+    
+    Jobs are dispatched to a process pool so several videos can be generated
+    in parallel, one per pool process.
     """
     
-    def __init__(self, check_interval: int = 2):
+    def __init__(self, check_interval: int = 2, max_workers: int = None):
         """
         Initialize worker
         
         Args:
-            check_interval: Seconds between queue checks
+            check_interval: Longest time the loop sleeps without checking the queue
+            max_workers: Number of videos generated in parallel
+                (defaults to config.PIPELINE_POOL_SIZE)
         """
         self.queue = JobQueue()
-        self.pipeline = VideoGeneratorPipeline()
         self.check_interval = check_interval
-        self.running = False
+        self.max_workers = max_workers or config.PIPELINE_POOL_SIZE
+        self.executor = None
+        self.active_jobs = {}  # Future -> job ID
+        self.shutdown_event = threading.Event()
+        self.wakeup_event = threading.Event()  # Set when a job finishes or the worker stops
+        
+    @property
+    def running(self) -> bool:
+        """Whether the worker loop is running"""
+        return not self.shutdown_event.is_set()
     
     def process_job(self, job: dict):
         """
-        Process a single video generation job
+        Submit a claimed job to the process pool
         
         Args:
-            job: Job dictionary
+            job: Job dictionary, already marked as processing
         """
         job_id = job['id']
         
+        logger.info("Processing job %s: %s", job_id, job['video_data'].get('title', 'Untitled'))
+        
+        future = self.executor.submit(_run_pipeline, job_id, job['video_data'])
+        self.active_jobs[future] = job_id
+        future.add_done_callback(lambda _: self.wakeup_event.set())
+        
+    def finish_job(self, future):
+        """
+        Record the outcome of a finished job
+        
+        Args:
+            future: Completed future returned by process_job
+        """
+        job_id = self.active_jobs.pop(future)
+        
         try:
-            print(f"\n{'='*60}")
-            print(f"Processing Job: {job_id}")
-            print(f"Title: {job['video_data'].get('title', 'Untitled')}")
-            print(f"{'='*60}\n")
-            
-            # Mark as processing
-            self.queue.update_job(job_id, {
-                'status': JobStatus.PROCESSING,
-                'progress': 5,
-                'message': 'Starting video generation...',
-                'started_at': datetime.now().isoformat()
-            })
-            
-            # Update progress - narration
-            self.queue.update_job(job_id, {
-                'progress': 15,
-                'message': 'Generating narration...'
-            })
-            
-            # Generate video using pipeline
-            result = self.pipeline.generate_video(job['video_data'])
+            result = future.result()
             
             # Mark as completed
             self.queue.update_job(job_id, {
@@ -69,15 +131,18 @@ class VideoWorker:
                 'result': result
             })
             
-            print(f"\n✓ Job {job_id} completed successfully!\n")
+            logger.info("✓ Job %s completed successfully", job_id)
+            
+        except BrokenProcessPool:
+            # The pool process died under the job; it didn't fail on its own
+            logger.warning("Job %s interrupted, its worker process stopped", job_id)
+            self._requeue_job(job_id)
             
         except Exception as e:
             error_message = str(e)
-            error_trace = traceback.format_exc()
+            error_trace = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
             
-            print(f"\n✗ Job {job_id} failed!")
-            print(f"Error: {error_message}")
-            print(f"Trace:\n{error_trace}\n")
+            logger.error("✗ Job %s failed: %s\n%s", job_id, error_message, error_trace)
             
             # Mark as failed
             self.queue.update_job(job_id, {
@@ -86,47 +151,138 @@ class VideoWorker:
                 'completed_at': datetime.now().isoformat(),
                 'error': error_trace
             })
+            
+        except BaseException:
+            # KeyboardInterrupt or SystemExit raised inside the pool process
+            logger.warning("Job %s interrupted", job_id)
+            self._requeue_job(job_id)
+    
+    def _requeue_job(self, job_id: str):
+        """
+        Put an interrupted job back in the queue for any worker to pick up
+        
+        Args:
+            job_id: Job identifier
+        """
+        self.queue.update_job(job_id, {
+            'status': JobStatus.QUEUED,
+            'progress': 0,
+            'message': 'Job re-queued after worker shutdown',
+            'started_at': None
+        })
     
     def run(self):
         """
         Main worker loop
-        Continuously checks for and processes jobs
+        Continuously checks for jobs and keeps the process pool busy
         """
-        self.running = True
+        self.shutdown_event.clear()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_pipeline
+        )
         
-        print(f"\n{'='*60}")
-        print("Video Generation Worker Started")
-        print(f"Checking queue every {self.check_interval} seconds")
-        print("Press Ctrl+C to stop")
-        print(f"{'='*60}\n")
+        logger.info("Video generation worker started")
+        logger.info("Processing up to %d videos in parallel", self.max_workers)
+        logger.info("Press Ctrl+C to stop")
         
         try:
-            while self.running:
-                # Get next job
-                job = self.queue.get_next_job()
+            while not self.shutdown_event.is_set():
+                # Cleared before looking at the jobs, so a job finishing
+                # after this point still cuts the wait below short
+                self.wakeup_event.clear()
                 
-                if job:
-                    self.process_job(job)
+                # Record finished jobs first, freeing their slots
+                finished = [future for future in self.active_jobs if future.done()]
+                for future in finished:
+                    self.finish_job(future)
+                    
+                # Fill free pool slots with queued jobs
+                free_slots = self.max_workers - len(self.active_jobs)
+                if free_slots > 0:
+                    # Claim atomically so several workers never take the same job
+                    jobs = self.queue.claim_next_jobs(free_slots, {
+                        'progress': 5,
+                        'message': 'Starting video generation...'
+                    })
+                    for job in jobs:
+                        self.process_job(job)
+                    if jobs:
+                        continue
+                        
+                if len(self.active_jobs) < self.max_workers:
+                    # Free slots: sleep until another process writes to the
+                    # queue or a running job finishes
+                    self.queue.wait_for_change(self.check_interval, self.wakeup_event)
                 else:
-                    # No jobs available, wait
-                    time.sleep(self.check_interval)
+                    # Pool full: only a finished job frees a slot
+                    self.wakeup_event.wait(self.check_interval)
                 
         except KeyboardInterrupt:
-            print("\n\nWorker stopped by user\n")
-            self.running = False
+            logger.info("Worker stopped by user")
+            self.shutdown_event.set()
         except Exception as e:
-            print(f"\n\nWorker error: {e}")
-            print(traceback.format_exc())
-            self.running = False
+            logger.exception("Worker error: %s", e)
+            self.shutdown_event.set()
+        finally:
+            self._shutdown()
+            
+    def _shutdown(self):
+        """Stop the pool, record jobs that finished and re-queue the rest"""
+        # Jobs that finished after the loop last looked (their wakeup came
+        # too late) are recorded as they ended, failures included; jobs
+        # whose process was interrupted stay for the re-queue below
+        for future, job_id in list(self.active_jobs.items()):
+            if not future.done() or future.cancelled():
+                continue
+            if isinstance(future.exception(), (KeyboardInterrupt, BrokenProcessPool)):
+                continue
+            try:
+                self.finish_job(future)
+            except Exception as e:
+                # One unrecordable result must not stop the cleanup
+                logger.error("Could not record job %s: %s", job_id, e)
+                self.active_jobs.pop(future, None)
+            
+        if self.executor:
+            # Queued futures never start; running ones are stopped with their
+            # pool process, so nothing keeps rendering (and reporting
+            # progress on) a job that is re-queued for another worker
+            for future in self.active_jobs:
+                future.cancel()
+            self._terminate_pool()
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            
+        for future, job_id in list(self.active_jobs.items()):
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # Completed before its process was stopped; keep the result
+                self.finish_job(future)
+                continue
+            self._requeue_job(job_id)
+        self.active_jobs.clear()
+        
+    def _terminate_pool(self):
+        """Kill the pool processes, abandoning the jobs they are running"""
+        terminate_workers = getattr(self.executor, 'terminate_workers', None)
+        if terminate_workers:
+            # Python 3.14+
+            terminate_workers()
+            return
+        for process in list((self.executor._processes or {}).values()):
+            process.terminate()
     
     def stop(self):
-        """Stop the worker"""
-        self.running = False
+        """Stop the worker; safe to call from another thread or a signal handler"""
+        self.shutdown_event.set()
+        self.wakeup_event.set()
 
 
 if __name__ == '__main__':
     """
     Run worker from command line
     """
+    setup_logging()
     worker = VideoWorker()
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
     worker.run()